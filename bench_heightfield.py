@@ -0,0 +1,207 @@
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from heightfield import (
+    WAVELENGTH, SPEED, RIPPLE_DECAY_LENGTH,
+    ActiveRipples, frange, grid_coords, combined_wave_with_gradient, culled_wave_with_gradient,
+    normals_from_gradient,
+)
+
+# --------------------------------------------------------------------------------
+#   Mikro-benchmark symulacji (bez GL): wysokości + normalne dla różnych siatek
+#   i liczby rippli. Wyniki w JSON można porównywać między commitami:
+#
+#       python bench_heightfield.py --output base.json
+#       python bench_heightfield.py --compare base.json
+# --------------------------------------------------------------------------------
+
+GRID_RANGES = (10, 20, 40)
+SPACINGS = (1.0, 0.5, 0.25, 0.1)
+RIPPLE_COUNTS = (0, 10, 100, 1000)
+
+# Czysty Python liczy 5 wywołań combined_wave na punkt (wysokość + 4 do normalnej);
+# powyżej tylu wywołań radial_ripple_contribution pomijamy tę ścieżkę
+MAX_PYTHON_WORK = 1000000
+
+
+# ---- Skalarna wersja fali z oryginalnego draw_water_reflective (punkt odniesienia) ----
+
+def base_wave_function(x, z, t):
+    """Podstawowa fala (sin(x+t) * cos(z+t))."""
+    return math.sin(x + t) * math.cos(z + t)
+
+
+def radial_ripple_contribution(x, z, t, ripple):
+    """
+    Jeden „ripple” (fala radialna).
+    ripple = (x0, z0, t0).
+    Wzór:
+       r = sqrt((x - x0)^2 + (z - z0)^2)
+       A = exp(−r / RIPPLE_DECAY_LENGTH) / (1 + 0.1 * r)
+       fala = A * sin(2π (r / WAVELENGTH − SPEED * (t − t0)))
+    """
+    x0, z0, t0 = ripple
+    dt = t - t0
+    if dt < 0:
+        return 0.0
+    dx = x - x0
+    dz = z - z0
+    r = math.sqrt(dx*dx + dz*dz)
+    A = math.exp(-r / RIPPLE_DECAY_LENGTH) / (1.0 + 0.1 * r)
+    phase = 2 * math.pi * (r / WAVELENGTH - SPEED * dt)
+    return A * math.sin(phase)
+
+
+def combined_wave(x, z, t, active):
+    """Suma podstawowej fali + wszystkich rippli z active, każdy z wagą (fade) weight."""
+    y = base_wave_function(x, z, t)
+    for x0, z0, t0, fade in zip(*active):
+        y += fade * radial_ripple_contribution(x, z, t, (x0, z0, t0))
+    return y
+
+
+def make_ripples(count, grid_range, t, seed=0):
+    rng = np.random.default_rng(seed)
+    return ActiveRipples(
+        rng.uniform(-grid_range, grid_range, count),
+        rng.uniform(-grid_range, grid_range, count),
+        rng.uniform(max(0.0, t - 3.0), t, count),
+        rng.uniform(0.0, 1.0, count),
+    )
+
+
+def python_heightfield(grid_range, spacing, t, active):
+    """Ścieżka z oryginalnego draw_water_reflective: frange + combined_wave + różnice centralne."""
+    xs = list(frange(-grid_range, grid_range, spacing))
+    zs = list(frange(-grid_range, grid_range, spacing))
+    eps = spacing * 0.5
+    out = []
+    for x in xs:
+        for z in zs:
+            y = combined_wave(x, z, t, active)
+            dx = (combined_wave(x + eps, z, t, active) - combined_wave(x - eps, z, t, active)) / (2 * eps)
+            dz = (combined_wave(x, z + eps, t, active) - combined_wave(x, z - eps, t, active)) / (2 * eps)
+            length = math.sqrt(dx*dx + 1.0 + dz*dz)
+            out.append((y, -dx / length, 1.0 / length, -dz / length))
+    return out
+
+
+def numpy_heightfield(grid_range, spacing, t, active):
+    X, Z = grid_coords(grid_range, spacing)
+    heights, gx, gz = combined_wave_with_gradient(X, Z, t, active)
+    return heights, normals_from_gradient(gx, gz)
+
+
+def culled_heightfield(grid_range, spacing, t, active):
+    heights, gx, gz = culled_wave_with_gradient(grid_range, spacing, t, active)
+    return heights, normals_from_gradient(gx, gz)
+
+
+def measure(fn, min_time, repeats):
+    """Mediana i minimum czasu jednego wywołania [ms]; co najmniej `repeats` prób i min_time sekund."""
+    fn()  # rozgrzewka (cache siatek, import itp.)
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeats or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        if len(samples) >= 1000:
+            break
+    return statistics.median(samples), min(samples), len(samples)
+
+
+def run(args):
+    t = 2.0
+    results = []
+    for grid_range in args.grid_ranges:
+        for spacing in args.spacings:
+            points = len(grid_coords(grid_range, spacing)[0].ravel())
+            for count in args.ripples:
+                active = make_ripples(count, grid_range, t)
+                cases = [
+                    ("numpy", lambda: numpy_heightfield(grid_range, spacing, t, active)),
+                    ("numpy_culled", lambda: culled_heightfield(grid_range, spacing, t, active)),
+                ]
+                if not args.no_python and points * 5 * max(1, count) <= args.max_python_work:
+                    cases.insert(0, ("python", lambda: python_heightfield(grid_range, spacing, t, active)))
+
+                for path, fn in cases:
+                    median_ms, min_ms, n = measure(fn, args.min_time, args.repeats)
+                    results.append({
+                        "path": path, "grid_range": grid_range, "spacing": spacing,
+                        "points": points, "ripples": count,
+                        "median_ms": median_ms, "min_ms": min_ms, "samples": n,
+                    })
+                    print("%-13s range=%-3d spacing=%-5g points=%-7d ripples=%-5d %10.3f ms" % (
+                        path, grid_range, spacing, points, count, median_ms))
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": results,
+    }
+
+
+def case_key(r):
+    return (r["path"], r["grid_range"], r["spacing"], r["ripples"])
+
+
+def compare(current, baseline, threshold):
+    """Wypisuje stosunek czasów do bazowych; zwraca liczbę przypadków wolniejszych niż threshold."""
+    base = {case_key(r): r for r in baseline["results"]}
+    regressions = 0
+    print("\n%-13s %-6s %-8s %-7s %10s %10s %7s" % ("path", "range", "spacing", "ripples", "base ms", "now ms", "ratio"))
+    for r in current["results"]:
+        b = base.get(case_key(r))
+        if b is None:
+            continue
+        ratio = r["median_ms"] / b["median_ms"] if b["median_ms"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        print("%-13s %-6d %-8g %-7d %10.3f %10.3f %7.2f%s" % (
+            r["path"], r["grid_range"], r["spacing"], r["ripples"], b["median_ms"], r["median_ms"], ratio, flag))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark heightfield + normal generation without GL.")
+    parser.add_argument("--grid-ranges", type=int, nargs="+", default=list(GRID_RANGES))
+    parser.add_argument("--spacings", type=float, nargs="+", default=list(SPACINGS))
+    parser.add_argument("--ripples", type=int, nargs="+", default=list(RIPPLE_COUNTS))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per case")
+    parser.add_argument("--max-python-work", type=int, default=MAX_PYTHON_WORK)
+    parser.add_argument("--no-python", action="store_true", help="skip the pure-Python path")
+    parser.add_argument("--output", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.10,
+                        help="ratio above which a case counts as a regression")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    current = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+# --------------------------------------------------------------------------------
+#   Ładowanie cubemapy z dyskowym cache przeskalowanych ścianek
+# --------------------------------------------------------------------------------
+
+# Katalog z gotowymi danymi RGB ścianek (klucz: hash pliku źródłowego + rozmiar)
+CUBEMAP_CACHE_DIR = ".cubemap_cache"
+
+# Dostępne rozmiary ścianek (od największego) i domyślny budżet pamięci tekstury
+RESOLUTION_TIERS = (2048, 1024, 512, 256, 128)
+TEXTURE_MEMORY_BUDGET = 160 * 1024 * 1024
+
+
+def cubemap_bytes(size, mipmaps=True):
+    """
+    Szacunkowa pamięć cubemapy na GPU: 6 ścianek, sterowniki zwykle trzymają
+    GL_RGB jako 4 bajty na piksel, a pełny łańcuch mipmap dokłada ok. 1/3.
+    """
+    base = 6 * size * size * 4
+    return base * 4 // 3 if mipmaps else base
+
+
+def pick_face_size(budget=TEXTURE_MEMORY_BUDGET, tiers=RESOLUTION_TIERS, mipmaps=True):
+    """Największy rozmiar z tiers, który mieści się w budżecie (albo najmniejszy dostępny)."""
+    for size in sorted(tiers, reverse=True):
+        if cubemap_bytes(size, mipmaps) <= budget:
+            return size
+    return min(tiers)
+
+
+def file_digest(path):
+    """SHA-1 zawartości pliku – zmiana obrazka unieważnia wpis w cache."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def decode_source(path):
+    """Dekoduje obraz do Surface 24/32-bitowego (tyle wymaga smoothscale)."""
+    surf = pygame.image.load(path)
+    if surf.get_bitsize() not in (24, 32):
+        # blit działa też bez okna (inaczej niż convert)
+        rgb = pygame.Surface(surf.get_size(), depth=24)
+        rgb.blit(surf, (0, 0))
+        surf = rgb
+    return surf
+
+
+def scale_face(surf, size):
+    """
+    Skaluje zdekodowany obraz do size × size.
+    Zwraca bajty RGB w kolejności wierszy oczekiwanej przez glTexImage2D.
+    """
+    surf = pygame.transform.smoothscale(surf, (size, size))
+    return pygame.image.tostring(surf, "RGB", True)
+
+
+def cached_face(path, size, cache_dir=CUBEMAP_CACHE_DIR, digest=None, decoded=None):
+    """
+    Dane RGB ścianki (size, size, 3) zmapowane z pliku w cache.
+    Przy pierwszym użyciu dekodujemy i skalujemy obraz, a wynik zapisujemy na dysk.
+    decoded – opcjonalny słownik {hash pliku: Surface} wspólny dla kilku rozmiarów:
+    obraz zdekodowany dla jednego rozmiaru jest potem tylko skalowany dla kolejnych.
+    """
+    digest = digest or file_digest(path)
+    cache_path = os.path.join(cache_dir, "%s_%d.rgb" % (digest, size))
+    if not os.path.exists(cache_path):
+        if decoded is None:
+            surf = decode_source(path)
+        else:
+            surf = decoded.get(digest)
+            if surf is None:
+                surf = decoded[digest] = decode_source(path)
+        data = scale_face(surf, size)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Osobny plik tymczasowy na wątek/proces: pliki o tej samej treści mogą
+        # być przygotowywane równolegle, a os.replace jest atomowe
+        tmp_path = "%s.%d.%d.tmp" % (cache_path, os.getpid(), threading.get_ident())
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    return np.memmap(cache_path, dtype=np.uint8, mode="r", shape=(size, size, 3))
+
+
+def prepare_faces(faces, directory, size, cache_dir=CUBEMAP_CACHE_DIR, workers=None, decoded=None):
+    """
+    Przygotowuje dane wszystkich unikalnych plików ścianek równolegle w puli wątków
+    (dekodowanie i smoothscale w pygame zwalniają GIL). Zwraca {nazwa pliku: dane RGB}.
+    Sam upload do OpenGL zostaje w wątku z kontekstem GL. decoded – jak w cached_face.
+    """
+    # Pliki o identycznej treści (ten sam hash) przygotowujemy tylko raz
+    digests = {}
+    for fname, _ in faces:
+        if fname not in digests:
+            digests[fname] = file_digest(os.path.join(directory, fname))
+    sources = {}
+    for fname, digest in digests.items():
+        sources.setdefault(digest, fname)
+
+    with ThreadPoolExecutor(max_workers=workers or len(sources)) as pool:
+        futures = {digest: pool.submit(cached_face, os.path.join(directory, fname), size, cache_dir,
+                                       digest, decoded)
+                   for digest, fname in sources.items()}
+        data = {digest: future.result() for digest, future in futures.items()}
+    return {fname: data[digest] for fname, digest in digests.items()}
+
+
+def mip_chain(data, size):
+    """
+    Kolejne poziomy mipmap (size², size/2², ..., 1²) liczone na CPU uśrednianiem 2×2
+    (size musi być potęgą dwójki, jak wszystkie RESOLUTION_TIERS).
+    Pozwala przygotować mipmapy w tle zamiast glGenerateMipmap w wątku GL.
+    """
+    level = np.asarray(data, dtype=np.uint8).reshape(size, size, 3)
+    levels = [level]
+    while size > 1:
+        size //= 2
+        level = level.reshape(size, 2, size, 2, 3).mean(axis=(1, 3), dtype=np.float32)
+        level = (level + 0.5).astype(np.uint8)
+        levels.append(level)
+    return levels
+
+
+def set_cubemap_params(mipmaps=True, generate=True):
+    """
+    Filtrowanie i zawijanie aktualnie zbindowanej cubemapy; z mipmapami – trójliniowe.
+    generate=False, gdy wszystkie poziomy mipmap zostały już wysłane.
+    """
+    if mipmaps:
+        if generate:
+            glGenerateMipmap(GL_TEXTURE_CUBE_MAP)
+        glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    else:
+        glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_R, GL_CLAMP_TO_EDGE)
+
+
+def load_cubemap_texture(faces, directory, size, cache_dir=CUBEMAP_CACHE_DIR, workers=None, mipmaps=True,
+                         decoded=None):
+    """
+    faces – lista (nazwa pliku, GL_TEXTURE_CUBE_MAP_*).
+    Każdy unikalny plik jest wczytywany raz, nawet jeśli trafia na kilka ścianek;
+    pliki przygotowujemy równolegle, a w wątku GL zostaje tylko glTexImage2D.
+    """
+    buffers = prepare_faces(faces, directory, size, cache_dir, workers, decoded)
+
+    tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_CUBE_MAP, tex)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    for fname, face in faces:
+        glTexImage2D(face, 0, GL_RGB, size, size, 0, GL_RGB, GL_UNSIGNED_BYTE, buffers[fname])
+    set_cubemap_params(mipmaps)
+    return tex
+
+
+def prepare_mip_chains(faces, directory, size, cache_dir=CUBEMAP_CACHE_DIR, workers=None, decoded=None):
+    """prepare_faces + łańcuchy mipmap, po jednym na unikalny plik: {nazwa pliku: [poziomy]}."""
+    buffers = prepare_faces(faces, directory, size, cache_dir, workers, decoded)
+    chains = {}
+    for fname, data in buffers.items():
+        chains[fname] = mip_chain(data, size)
+    return chains
+
+
+class ProgressiveCubemap:
+    """
+    Cubemapa ładowana etapami, żeby pierwsza klatka nie czekała na 2048²:
+      1. od razu mała wersja (preview_size) każdej ścianki – gotowa do rysowania,
+      2. w tle (osobny wątek + pula z prepare_faces) pełna rozdzielczość
+         razem z mipmapami liczonymi na CPU,
+      3. step() co klatkę wysyła do nowej tekstury najwyżej jedną ściankę;
+         gdy wszystkie są na miejscu, podmieniamy teksturę i kasujemy podgląd.
+    Podmiana dopiero po komplecie, bo cubemapa z ściankami różnych rozmiarów
+    jest niekompletna i w shaderze dałaby czarny kolor.
+    Przy pustym cache każdy plik jest dekodowany raz: podgląd skaluje obraz,
+    a zadanie w tle dostaje te same Surface i tylko skaluje je do size.
+    """
+
+    def __init__(self, faces, directory, size, preview_size=128, cache_dir=CUBEMAP_CACHE_DIR,
+                 workers=None, mipmaps=True):
+        self.faces = list(faces)
+        self.size = size
+        self.mipmaps = mipmaps
+        decoded = {}
+        self.texture = load_cubemap_texture(self.faces, directory, preview_size, cache_dir, workers, mipmaps,
+                                            decoded)
+        self.done = preview_size == size
+
+        self._pending = []
+        self._staging = None
+        self._executor = None
+        self._future = None
+        if not self.done:
+            prepare = prepare_mip_chains if mipmaps else prepare_faces
+            self._executor = ThreadPoolExecutor(max_workers=1)
+            self._future = self._executor.submit(prepare, self.faces, directory, size, cache_dir, workers,
+                                                 decoded)
+
+    def step(self):
+        """Wywoływane raz na klatkę w wątku GL; zwraca aktualny identyfikator tekstury."""
+        if self.done or not self._future.done():
+            return self.texture
+
+        if self._staging is None:
+            buffers = self._future.result()
+            self._executor.shutdown(wait=False)
+            self._pending = [(face, buffers[fname]) for fname, face in self.faces]
+            self._staging = glGenTextures(1)
+
+        face, data = self._pending.pop(0)
+        glBindTexture(GL_TEXTURE_CUBE_MAP, self._staging)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        levels = data if self.mipmaps else [data]
+        for level, pixels in enumerate(levels):
+            n = self.size >> level
+            glTexImage2D(face, level, GL_RGB, n, n, 0, GL_RGB, GL_UNSIGNED_BYTE, pixels)
+
+        if not self._pending:
+            set_cubemap_params(self.mipmaps, generate=False)
+            glDeleteTextures([self.texture])
+            self.texture = self._staging
+            self._staging = None
+            self.done = True
+        return self.texture
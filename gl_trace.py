@@ -0,0 +1,158 @@
+import os
+import sys
+from collections import Counter
+
+import OpenGL.GL
+import OpenGL.GLU
+
+# --------------------------------------------------------------------------------
+#   Opcjonalne śledzenie wywołań PyOpenGL: liczniki na klatkę według funkcji
+#   i według rysującej procedury (draw_water_reflective, draw_skybox, ...)
+#
+#   Włączane zmienną środowiskową:  WATER_GL_TRACE=1 (raport na stdout)
+#                                   WATER_GL_TRACE=raport.txt (raport do pliku)
+# --------------------------------------------------------------------------------
+
+TRACE_ENV = "WATER_GL_TRACE"
+
+# Procedury, do których przypisujemy wywołania (najbliższa na stosie wygrywa)
+TRACED_ROUTINES = (
+    "draw_water_reflective", "draw_water_gpu", "draw_water_lod", "draw_water_threaded",
+    "draw_water_parallel", "draw_water_interpolated", "draw_skybox", "draw_expanded_skybox",
+    "draw_axes", "draw_hud",
+)
+OTHER_ROUTINE = "other"
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def gl_entry_points():
+    """{nazwa: funkcja} dla wszystkich gl*/glu* z PyOpenGL."""
+    points = {}
+    for module in (OpenGL.GL, OpenGL.GLU):
+        for name, obj in vars(module).items():
+            if name.startswith("gl") and callable(obj):
+                points[name] = obj
+    return points
+
+
+def project_modules():
+    """Moduły projektu (pliki z tego katalogu, także __main__) – tylko je podmieniamy."""
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.dirname(os.path.abspath(path)) == _PROJECT_DIR:
+            yield module
+
+
+class GLCallTracer:
+    """
+    Podmienia gl*-funkcje zaimportowane do modułów projektu (from OpenGL.GL import *)
+    na liczące opakowania. Każde wywołanie trafia do licznika (procedura, funkcja);
+    procedurę znajdujemy, idąc w górę stosu do pierwszej nazwy z `routines`.
+    end_frame() zamyka klatkę; report() podaje średnie liczby wywołań na klatkę.
+    Śledzenie samo kosztuje – czasów klatki z włączonym tracerem nie porównujemy.
+    """
+
+    def __init__(self, routines=TRACED_ROUTINES):
+        self.routines = frozenset(routines)
+        self.frames = 0
+        self.totals = Counter()
+        self.frame_totals = []
+        self._current = Counter()
+        self._patched = []
+
+    def install(self, modules=None):
+        points = gl_entry_points()
+        for module in (project_modules() if modules is None else modules):
+            namespace = vars(module)
+            for name, obj in list(namespace.items()):
+                if points.get(name) is obj:
+                    namespace[name] = self._wrap(name, obj)
+                    self._patched.append((namespace, name, obj))
+        return self
+
+    def uninstall(self):
+        for namespace, name, obj in self._patched:
+            namespace[name] = obj
+        self._patched = []
+
+    def _wrap(self, name, fn):
+        counts = self._current
+        routines = self.routines
+
+        def traced(*args, **kwargs):
+            frame = sys._getframe(1)
+            while frame is not None and frame.f_code.co_name not in routines:
+                frame = frame.f_back
+            counts[(frame.f_code.co_name if frame is not None else OTHER_ROUTINE, name)] += 1
+            return fn(*args, **kwargs)
+
+        traced.__name__ = name
+        traced.__wrapped__ = fn
+        return traced
+
+    def end_frame(self):
+        self.totals.update(self._current)
+        self.frame_totals.append(sum(self._current.values()))
+        self._current.clear()
+        self.frames += 1
+
+    def reset(self):
+        """Zeruje liczniki (np. po rozgrzewce albo po inicjalizacji)."""
+        self.totals.clear()
+        self.frame_totals = []
+        self._current.clear()
+        self.frames = 0
+
+    def summary(self):
+        """Średnia liczba wywołań na klatkę: łącznie, według procedury i według funkcji."""
+        frames = max(self.frames, 1)
+        by_routine, by_function = Counter(), Counter()
+        for (routine, name), n in self.totals.items():
+            by_routine[routine] += n
+            by_function[name] += n
+        return {
+            "frames": self.frames,
+            "calls_per_frame": sum(self.totals.values()) / frames,
+            "max_calls_per_frame": max(self.frame_totals, default=0),
+            "by_routine": {k: n / frames for k, n in by_routine.most_common()},
+            "by_function": {k: n / frames for k, n in by_function.most_common()},
+            "by_routine_function": {"%s:%s" % k: n / frames for k, n in self.totals.most_common()},
+        }
+
+    def report(self, top=15):
+        s = self.summary()
+        lines = ["GL calls: %d frames, %.1f calls/frame (max %d)" % (
+            s["frames"], s["calls_per_frame"], s["max_calls_per_frame"])]
+        lines.append("by routine (calls/frame):")
+        lines += ["  %-24s %10.1f" % kv for kv in s["by_routine"].items()]
+        lines.append("by function (calls/frame, top %d):" % top)
+        lines += ["  %-24s %10.1f" % kv for kv in list(s["by_function"].items())[:top]]
+        lines.append("by routine:function (calls/frame, top %d):" % top)
+        lines += ["  %-48s %10.1f" % kv for kv in list(s["by_routine_function"].items())[:top]]
+        return "\n".join(lines)
+
+    def close(self, path=None):
+        """Przywraca oryginalne funkcje i wypisuje raport (na stdout albo do pliku)."""
+        self.uninstall()
+        text = self.report()
+        if path:
+            with open(path, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+
+
+def trace_from_env(env=TRACE_ENV):
+    """Tracer zainstalowany w modułach projektu, jeśli ustawiono zmienną środowiskową; inaczej None."""
+    if not os.environ.get(env):
+        return None
+    return GLCallTracer().install()
+
+
+def close_trace(tracer, env=TRACE_ENV):
+    """Kończy śledzenie; raport do pliku z env (chyba że to po prostu „1”)."""
+    if tracer is None:
+        return
+    target = os.environ.get(env)
+    tracer.close(None if target == "1" else target)
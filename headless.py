@@ -0,0 +1,283 @@
+import os
+
+# PyOpenGL wybiera platformę przy pierwszym imporcie, więc ustawiamy ją wcześniej.
+# Domyślnie EGL bez okna (np. Mesa llvmpipe); PYOPENGL_PLATFORM=osmesa też działa.
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import ctypes
+import importlib
+import json
+import random
+import time
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+from gl_trace import GLCallTracer
+from sim_clock import SimClock, REFERENCE_FPS
+
+# --------------------------------------------------------------------------------
+#   Tryb headless: scena z import.py renderowana do FBO, bez okna i bez GPU,
+#   z syntetycznymi kliknięciami i statystykami czasu klatki
+# --------------------------------------------------------------------------------
+
+# „import” jest słowem kluczowym, więc moduł ładujemy przez importlib
+app = importlib.import_module("import")
+
+
+def create_egl_context(width, height):
+    from OpenGL import EGL
+
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("eglInitialize failed")
+
+    attribs = [
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8, EGL.EGL_ALPHA_SIZE, 8,
+        EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE,
+    ]
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    if not EGL.eglChooseConfig(display, (EGL.EGLint * len(attribs))(*attribs),
+                               ctypes.pointer(config), 1, ctypes.pointer(count)) or not count.value:
+        raise RuntimeError("no suitable EGL config")
+
+    surface_attribs = [EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE]
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * len(surface_attribs))(*surface_attribs))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("eglMakeCurrent failed")
+    return display, surface, context
+
+
+def create_osmesa_context(width, height):
+    from OpenGL import arrays, osmesa
+
+    context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+    buffer = arrays.GLubyteArray.zeros((height, width, 4))
+    if not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, width, height):
+        raise RuntimeError("OSMesaMakeCurrent failed")
+    return context, buffer
+
+
+def create_context(width, height):
+    platform = os.environ["PYOPENGL_PLATFORM"]
+    if platform == "egl":
+        return create_egl_context(width, height)
+    if platform == "osmesa":
+        return create_osmesa_context(width, height)
+    raise RuntimeError("unsupported PYOPENGL_PLATFORM for headless mode: %r" % platform)
+
+
+def destroy_context(context):
+    """Zwalnia kontekst z create_context – po ostatnim wywołaniu GL."""
+    platform = os.environ["PYOPENGL_PLATFORM"]
+    if platform == "egl":
+        from OpenGL import EGL
+
+        display, surface, egl_context = context
+        EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroySurface(display, surface)
+        EGL.eglDestroyContext(display, egl_context)
+        EGL.eglTerminate(display)
+    elif platform == "osmesa":
+        from OpenGL import osmesa
+
+        osmesa.OSMesaDestroyContext(context[0])
+
+
+def create_framebuffer(width, height):
+    """FBO z buforem koloru RGBA8 i głębokości – do niego trafia cała scena."""
+    fbo = glGenFramebuffers(1)
+    glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+    color, depth = glGenRenderbuffers(2)
+    glBindRenderbuffer(GL_RENDERBUFFER, color)
+    glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+    glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, color)
+    glBindRenderbuffer(GL_RENDERBUFFER, depth)
+    glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+    glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth)
+    if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+        raise RuntimeError("offscreen framebuffer is incomplete")
+    glViewport(0, 0, width, height)
+    return fbo
+
+
+def solid_cubemap(rgb=(90, 140, 190)):
+    tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_CUBE_MAP, tex)
+    pixel = np.array(rgb, dtype=np.uint8)
+    for _, face in app.CUBE_MAP_FACES:
+        glTexImage2D(face, 0, GL_RGB, 1, 1, 0, GL_RGB, GL_UNSIGNED_BYTE, pixel)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    return tex
+
+
+def load_skybox():
+    missing = sorted({fname for fname, _ in app.CUBE_MAP_FACES
+                      if not os.path.exists(os.path.join(app.CUBE_MAP_DIR, fname))})
+    if missing:
+        print("Brak plików skyboxa (%s) – używam jednolitej cubemapy" % ", ".join(missing))
+        return solid_cubemap()
+    return app.load_cubemap()
+
+
+def frame_stats(times):
+    ms = np.array(times) * 1000.0
+    return {
+        "frames": len(ms),
+        "mean_ms": float(ms.mean()),
+        "min_ms": float(ms.min()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "fps": float(1000.0 / ms.mean()),
+    }
+
+
+def save_screenshot(path, width, height):
+    pixels = glReadPixels(0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE)
+    surf = pygame.image.frombuffer(bytes(pixels), (width, height), "RGBA")
+    pygame.image.save(pygame.transform.flip(surf, False, True), path)
+
+
+def run(args):
+    context = create_context(args.width, args.height)
+    create_framebuffer(args.width, args.height)
+
+    app.WATER_MODE = args.mode
+    app.WATER_GRID_RANGE = args.grid_range
+    app.WATER_SPACING = args.spacing
+    app.WATER_LOD = args.lod
+    app.WATER_LOD_LEVELS = args.lod_levels
+    app.WAVE_MODEL = args.wave_model
+    app.RIPPLE_MODEL = args.ripple_model
+    app.WATER_THREADED = args.threaded
+    app.WATER_PROCESSES = args.processes
+    app.WATER_INTERPOLATED = args.interpolated
+    app.WAVE_CACHE = args.wave_cache
+    app.sim_clock = SimClock(args.sim_step)
+    app.CUBE_MAP_SIZE = args.cubemap_size
+    app.skybox_tex = load_skybox()
+    app.init_scene(args.width, args.height)
+
+    app.profiler.hud_visible = args.hud
+    tracer = GLCallTracer().install() if args.gl_trace else None
+    rng = random.Random(args.seed)
+    yaw, pitch, time_val = 0.0, args.pitch, 0.0
+    times = []
+    for frame in range(args.warmup + args.frames):
+        # Syntetyczne wejście: co ripple_every klatek „kliknięcie” w losowym punkcie siatki
+        if args.ripple_every and frame % args.ripple_every == 0:
+            g = app.WATER_GRID_RANGE
+            app.add_ripple(rng.uniform(-g, g), rng.uniform(-g, g), time_val, app.frame_count)
+
+        app.profiler.begin_frame()
+        start = time.perf_counter()
+        app.draw_scene(yaw, pitch, time_val)
+        app.profiler.draw_hud(args.height)
+        with app.profiler.phase("flip"):
+            glFinish()
+        elapsed = time.perf_counter() - start
+        app.profiler.end_frame()
+        if tracer:
+            tracer.end_frame()
+            if frame + 1 == args.warmup:
+                tracer.reset()
+        if frame >= args.warmup:
+            times.append(elapsed)
+
+        yaw += args.yaw_speed
+        # Stały krok czasu rzeczywistego na klatkę – wyniki nie zależą od szybkości maszyny
+        app.sim_clock.advance(1.0 / args.fps)
+        time_val = app.sim_clock.now
+        app.frame_count = app.sim_clock.frame
+
+    app.close_sim_workers()
+    if args.screenshot:
+        save_screenshot(args.screenshot, args.width, args.height)
+
+    result = {
+        "renderer": glGetString(GL_RENDERER).decode(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "screenshot")},
+        "stats": frame_stats(times),
+        "phases": {name: {"p50_ms": p50, "p99_ms": p99}
+                   for name, (p50, p99) in app.profiler.stats().items()},
+    }
+    if tracer:
+        tracer.uninstall()
+        result["gl_calls"] = tracer.summary()
+        print(tracer.report())
+    destroy_context(context)
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render the water scene offscreen and report frame times.")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--mode", choices=("cpu", "gpu"), default=app.WATER_MODE)
+    parser.add_argument("--grid-range", type=int, default=app.WATER_GRID_RANGE)
+    parser.add_argument("--spacing", type=float, default=app.WATER_SPACING)
+    parser.add_argument("--lod", action="store_true", help="draw the water as clipmap LOD rings (cpu mode)")
+    parser.add_argument("--lod-levels", type=int, default=app.WATER_LOD_LEVELS)
+    parser.add_argument("--wave-model", choices=("analytic", "fft"), default=app.WAVE_MODEL,
+                        help="base wave under the ripples (cpu and LOD modes)")
+    parser.add_argument("--ripple-model", choices=("analytic", "solver"), default=app.RIPPLE_MODEL,
+                        help="analytic ripples or the wave-equation solver (cpu and LOD modes)")
+    parser.add_argument("--threaded", action="store_true",
+                        help="simulate the water in a background thread (cpu mode)")
+    parser.add_argument("--processes", type=int, default=app.WATER_PROCESSES,
+                        help="evaluate the water grid in this many worker processes (cpu mode)")
+    parser.add_argument("--fps", type=float, default=REFERENCE_FPS,
+                        help="simulated frame rate: real seconds per frame fed to the simulation clock")
+    parser.add_argument("--sim-step", type=float, default=app.SIM_STEP,
+                        help="fixed simulation step in animation time units (0.06 = 30 Hz)")
+    parser.add_argument("--interpolated", action="store_true",
+                        help="simulate only on clock steps and blend the last two states (cpu mode)")
+    parser.add_argument("--wave-cache", action="store_true",
+                        help="interpolate the analytic base wave from a cached period (cpu mode)")
+    parser.add_argument("--cubemap-size", type=int, default=512)
+    parser.add_argument("--ripple-every", type=int, default=10,
+                        help="add a synthetic ripple every N frames (0 = none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pitch", type=float, default=15.0)
+    parser.add_argument("--yaw-speed", type=float, default=0.5, help="degrees per frame")
+    parser.add_argument("--hud", action="store_true", help="draw the frame-phase overlay")
+    parser.add_argument("--gl-trace", action="store_true",
+                        help="count GL calls per frame (slows rendering; times are not comparable)")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--screenshot", help="save the last frame as an image")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    result = run(args)
+    stats = result["stats"]
+    print("renderer: %s" % result["renderer"])
+    print("frames: %d  mean %.2f ms  p50 %.2f  p95 %.2f  p99 %.2f  max %.2f  (%.1f fps)" % (
+        stats["frames"], stats["mean_ms"], stats["p50_ms"], stats["p95_ms"],
+        stats["p99_ms"], stats["max_ms"], stats["fps"]))
+    for name, phase in result["phases"].items():
+        print("  %-8s p50 %8.2f  p99 %8.2f" % (name, phase["p50_ms"], phase["p99_ms"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
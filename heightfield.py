@@ -0,0 +1,252 @@
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+# --------------------------------------------------------------------------------
+#   Wektorowa wersja fali: podstawowa fala + ripple liczone na całej siatce naraz
+# --------------------------------------------------------------------------------
+
+# ---- Parametry fali radialnej ----
+WAVELENGTH = 5.0
+SPEED = 1.0
+
+# Maksymalny czas życia ripple’a (w klatkach)
+MAX_LIFETIME = 100
+
+# Ile elementów (ripple × punkt siatki) liczymy w jednej operacji NumPy.
+# Przy wielu ripplach dzielimy je na paczki, żeby nie alokować gigantycznych tablic.
+RIPPLE_CHUNK_ELEMENTS = 1 << 20
+
+# Długość zaniku amplitudy ripple’a: A = weight · exp(−r / L) / (1 + 0.1 r).
+# Sam czynnik 1 / (1 + 0.1 r) maleje tak wolno, że ripple sięgałby setek jednostek
+# i obcinanie nie miałoby czego pominąć; z zanikiem ripple gaśnie po ok. dwóch
+# długościach fali.
+RIPPLE_DECAY_LENGTH = WAVELENGTH / 2
+
+# Próg amplitudy ripple’a: tam, gdzie A spada poniżej progu, ripple jest pomijany.
+# Daje to skończony promień wpływu (0 = bez obcinania), dla weight = 1 ok. 8 jednostek.
+RIPPLE_AMPLITUDE_CUTOFF = 0.02
+
+# Bok kafla (w punktach siatki), do którego przypisujemy ripple przy obcinaniu
+RIPPLE_TILE_POINTS = 8
+
+# Narzut jednego kafla (osobne wywołanie ripple_grid_with_gradient) w jednostkach
+# pracy punkt × ripple – przy kilku ripplach kafle się nie opłacają
+RIPPLE_TILE_OVERHEAD = 600
+
+# Aktywne ripple w postaci tablic: x0, z0, t0 oraz waga amplitudy (fade).
+ActiveRipples = namedtuple("ActiveRipples", ["x0", "z0", "t0", "weight"])
+
+NO_RIPPLES = ActiveRipples(*(np.zeros(0) for _ in range(4)))
+
+
+def frange(start, stop, step):
+    while start < stop:
+        yield round(start, 5)
+        start += step
+
+
+@lru_cache(maxsize=16)
+def grid_axis(grid_range, spacing):
+    """Współrzędne jednej osi siatki – dokładnie te same co list(frange(...))."""
+    axis = np.array(list(frange(-grid_range, grid_range, spacing)), dtype=np.float64)
+    axis.flags.writeable = False
+    return axis
+
+
+@lru_cache(maxsize=16)
+def grid_coords(grid_range, spacing):
+    """
+    Siatka (X, Z) o kształcie (len(xs), len(zs)); X[i, j] = xs[i], Z[i, j] = zs[j].
+    Tablice są cache’owane i tylko do odczytu.
+    """
+    axis = grid_axis(grid_range, spacing)
+    X, Z = np.meshgrid(axis, axis, indexing="ij")
+    X.flags.writeable = False
+    Z.flags.writeable = False
+    return X, Z
+
+
+def _ripple_chunks(active, t, n_points):
+    """Dzieli ripple (już rozpoczęte, t0 <= t) na paczki o ograniczonym rozmiarze."""
+    started = active.t0 <= t
+    x0, z0 = active.x0[started], active.z0[started]
+    t0, weight = active.t0[started], active.weight[started]
+    step = max(1, RIPPLE_CHUNK_ELEMENTS // max(1, n_points))
+    for k in range(0, len(x0), step):
+        yield x0[k:k+step], z0[k:k+step], t0[k:k+step], weight[k:k+step]
+
+
+def base_wave_with_gradient(x, z, t):
+    """
+    Podstawowa fala razem z pochodnymi cząstkowymi:
+       h     = sin(x+t) * cos(z+t)
+       dh/dx = cos(x+t) * cos(z+t)
+       dh/dz = -sin(x+t) * sin(z+t)
+    Działa zarówno dla skalarów, jak i tablic.
+    """
+    sx, cx = np.sin(x + t), np.cos(x + t)
+    sz, cz = np.sin(z + t), np.cos(z + t)
+    return sx * cz, cx * cz, -sx * sz
+
+
+def ripple_grid_with_gradient(X, Z, t, active, cutoff=0.0):
+    """
+    Suma rippli na siatce razem z analitycznym gradientem: (h, dh/dx, dh/dz).
+       A = weight * exp(−r / L) / (1 + 0.1 * r),  L = RIPPLE_DECAY_LENGTH
+       fala = A * sin(φ),  φ = 2π (r / WAVELENGTH − SPEED * (t − t0))
+       dh/dr = A'(r) sin(φ) + A(r) cos(φ) · 2π / WAVELENGTH,
+       A'(r) = −A (0.1 / (1 + 0.1 r) + 1 / L)
+       dh/dx = dh/dr · dx / r,   dh/dz = dh/dr · dz / r   (w r = 0 gradient zerowy)
+    Z cutoff > 0 ripple jest zerowany w punktach, gdzie |A| < cutoff – tak jak
+    w shaderze trybu „gpu”. Wynik w punkcie nie zależy wtedy od tego, które
+    ripple odrzuciło kubełkowanie, więc sąsiednie kafle/poziomy LOD zgadzają się
+    na wspólnych krawędziach.
+    """
+    y = np.zeros(np.shape(X))
+    gx = np.zeros(np.shape(X))
+    gz = np.zeros(np.shape(X))
+    k = 2 * math.pi / WAVELENGTH
+    for x0, z0, t0, weight in _ripple_chunks(active, t, np.size(X)):
+        shape = (-1,) + (1,) * np.ndim(X)
+        dx = X - x0.reshape(shape)
+        dz = Z - z0.reshape(shape)
+        r = np.sqrt(dx*dx + dz*dz)
+        inv = 1.0 / (1.0 + 0.1 * r)
+        A = weight.reshape(shape) * np.exp(-r / RIPPLE_DECAY_LENGTH) * inv
+        if cutoff > 0:
+            A[np.abs(A) < cutoff] = 0.0
+        phase = 2 * math.pi * (r / WAVELENGTH - SPEED * (t - t0).reshape(shape))
+        s, c = np.sin(phase), np.cos(phase)
+        y += (A * s).sum(axis=0)
+        dh_dr = A * (k * c - (0.1 * inv + 1.0 / RIPPLE_DECAY_LENGTH) * s)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dr_inv = np.where(r > 0.0, 1.0 / r, 0.0)
+        gx += (dh_dr * dx * dr_inv).sum(axis=0)
+        gz += (dh_dr * dz * dr_inv).sum(axis=0)
+    return y, gx, gz
+
+
+def combined_wave_with_gradient(X, Z, t, active=NO_RIPPLES, cutoff=0.0, base=base_wave_with_gradient):
+    """
+    Wysokość i gradient całej powierzchni liczone raz na punkt siatki –
+    sąsiednie trójkąty dzielą potem te same wartości.
+    base(X, Z, t) -> (h, dh/dx, dh/dz) to model fali pod ripplami
+    (domyślnie sin · cos, np. OceanFFT.wave_with_gradient dla oceanu z widma).
+    """
+    y, gx, gz = base(X, Z, t)
+    if len(active.x0):
+        ry, rgx, rgz = ripple_grid_with_gradient(X, Z, t, active, cutoff)
+        y += ry
+        gx += rgx
+        gz += rgz
+    return y, gx, gz
+
+
+def normals_from_gradient(gx, gz):
+    """Normalne (−dh/dx, 1, −dh/dz) znormalizowane, tablica (..., 3)."""
+    n = np.stack((-gx, np.ones_like(gx), -gz), axis=-1)
+    n /= np.linalg.norm(n, axis=-1, keepdims=True)
+    return n
+
+
+# --------------------------------------------------------------------------------
+#   Obcinanie rippli: promień wpływu + kubełkowanie na kafle siatki
+# --------------------------------------------------------------------------------
+
+def influence_radius(weight, cutoff=RIPPLE_AMPLITUDE_CUTOFF):
+    """
+    Promień, poza którym |A| < cutoff, czyli rozwiązanie
+       r = g(r) = L * (ln(|weight| / cutoff) − ln(1 + 0.1 r)).
+    r0 = L * ln(|weight| / cutoff) (bez czynnika 1 / (1 + 0.1 r)) jest ograniczeniem
+    z góry; g jest malejąca, więc g(r0) ogranicza z dołu, a g(g(r0)) znów z góry –
+    już blisko dokładnego promienia.
+    Dla cutoff <= 0 promień jest nieskończony.
+    """
+    weight = np.abs(np.asarray(weight, dtype=np.float64))
+    if cutoff <= 0:
+        return np.full(weight.shape, np.inf)
+    with np.errstate(divide="ignore"):
+        log_ratio = np.log(weight / cutoff)
+    r = np.maximum(0.0, RIPPLE_DECAY_LENGTH * log_ratio)
+    for _ in range(2):
+        r = np.maximum(0.0, RIPPLE_DECAY_LENGTH * (log_ratio - np.log1p(0.1 * r)))
+    return r
+
+
+def tile_slices(n, tile):
+    return [slice(k, min(n, k + tile)) for k in range(0, n, tile)]
+
+
+def bucket_ripples(xs, zs, active, radius, tile=RIPPLE_TILE_POINTS):
+    """
+    Dzieli siatkę (osie xs, zs) na kafle tile × tile punktów i dla każdego kafla
+    wybiera ripple, których koło wpływu przecina prostokąt kafla.
+    Zwraca listę (slice_x, slice_z, indeksy rippli) – tylko niepuste kafle.
+    """
+    sx = tile_slices(len(xs), tile)
+    sz = tile_slices(len(zs), tile)
+    x_lo = np.array([xs[s.start] for s in sx])
+    x_hi = np.array([xs[s.stop - 1] for s in sx])
+    z_lo = np.array([zs[s.start] for s in sz])
+    z_hi = np.array([zs[s.stop - 1] for s in sz])
+
+    # Odległość środka ripple’a od prostokąta kafla, osobno w X i Z: (kafle, ripple)
+    dx = np.maximum(0.0, np.maximum(x_lo[:, None] - active.x0, active.x0 - x_hi[:, None]))
+    dz = np.maximum(0.0, np.maximum(z_lo[:, None] - active.z0, active.z0 - z_hi[:, None]))
+    r2 = radius * radius
+
+    buckets = []
+    for a, slice_x in enumerate(sx):
+        near_x = dx[a] * dx[a]
+        for b, slice_z in enumerate(sz):
+            idx = np.flatnonzero(near_x + dz[b] * dz[b] <= r2)
+            if idx.size:
+                buckets.append((slice_x, slice_z, idx))
+    return buckets
+
+
+def culled_wave_with_gradient(grid_range, spacing, t, active=NO_RIPPLES,
+                              cutoff=RIPPLE_AMPLITUDE_CUTOFF, tile=RIPPLE_TILE_POINTS,
+                              base=base_wave_with_gradient):
+    """
+    Jak combined_wave_with_gradient na siatce (grid_range, spacing), ale każdy kafel
+    sumuje tylko ripple, które do niego sięgają. Koszt zależy od lokalnej gęstości
+    rippli, a nie od ich całkowitej liczby. Ripple jest obcinany w każdym punkcie,
+    w którym jego amplituda spada poniżej cutoff (jak w shaderze), więc pominięcie
+    go w kaflu niczego nie zmienia.
+    """
+    X, Z = grid_coords(grid_range, spacing)
+    return culled_block_with_gradient(X, Z, t, active, cutoff, tile, base)
+
+
+def culled_block_with_gradient(X, Z, t, active=NO_RIPPLES,
+                               cutoff=RIPPLE_AMPLITUDE_CUTOFF, tile=RIPPLE_TILE_POINTS,
+                               base=base_wave_with_gradient):
+    """
+    culled_wave_with_gradient dla dowolnego prostokątnego fragmentu siatki (X, Z).
+    Gdy kafle nie oszczędzają pracy (promienie wpływu większe niż fragment albo
+    tak mało rippli, że przeważa narzut kafli), liczymy cały fragment naraz –
+    tylko z ripplami, które do niego sięgają.
+    """
+    y, gx, gz = base(X, Z, t)
+    if not len(active.x0):
+        return y, gx, gz
+
+    xs, zs = X[:, 0], Z[0, :]
+    radius = influence_radius(active.weight, cutoff)
+    buckets = bucket_ripples(xs, zs, active, radius, tile)
+    tiled_work = sum(np.size(X[slice_x, slice_z]) * len(idx) + RIPPLE_TILE_OVERHEAD
+                     for slice_x, slice_z, idx in buckets)
+    reaching = bucket_ripples(xs, zs, active, radius, max(X.shape))
+    if reaching and tiled_work >= np.size(X) * len(reaching[0][2]):
+        buckets = [(slice(None), slice(None), reaching[0][2])]
+    for slice_x, slice_z, idx in buckets:
+        subset = ActiveRipples(*(a[idx] for a in active))
+        ry, rgx, rgz = ripple_grid_with_gradient(X[slice_x, slice_z], Z[slice_x, slice_z], t, subset, cutoff)
+        y[slice_x, slice_z] += ry
+        gx[slice_x, slice_z] += rgx
+        gz[slice_x, slice_z] += rgz
+    return y, gx, gz
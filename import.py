@@ -1,10 +1,30 @@
 import os
-import math
+from functools import partial
+import numpy as np
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
-from OpenGL.GL import shaders
+
+from heightfield import (
+    WAVELENGTH, SPEED,
+    RIPPLE_DECAY_LENGTH, RIPPLE_AMPLITUDE_CUTOFF, NO_RIPPLES, base_wave_with_gradient,
+    grid_coords, culled_wave_with_gradient, normals_from_gradient,
+)
+from ripple_store import RippleStore
+from water_tiles import WaterTiles, BASE_WAVE_AMPLITUDE
+from water_lod import ClipmapWater, LOD_LEVELS, LOD_RING_QUADS
+from ocean_fft import OceanFFT
+from wave_solver import WaveSolver
+from sim_worker import SimulationWorker
+from parallel_heightfield import ParallelWater
+from sim_clock import SimClock, InterpolatedState, SIM_STEP
+from wave_cache import BaseWaveCache
+from cubemap import load_cubemap_texture, pick_face_size, ProgressiveCubemap
+from instrumentation import FrameProfiler
+from gl_trace import trace_from_env, close_trace
+from shader_manager import ShaderManager
+from static_geometry import expanded_skybox_mesh
 
 # --------------------------------------------------------------------------------
 #   Wave & water with animated cubemap reflection, refraction + radial ripples
@@ -62,145 +82,441 @@ void main() {
 }
 """
 
-def compile_shader():
-    vertex = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
-    fragment = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
-    return shaders.compileProgram(vertex, fragment)
+# Maksymalna liczba rippli przekazywanych do shadera (tablica uniformów vec4)
+MAX_GPU_RIPPLES = 64
+
+# Vertex shader dla trybu „gpu”: cała fala (podstawowa + ripple + fade) liczona
+# na karcie. Siatka w VBO jest płaska i w jednostkach siatki; skalujemy ją tutaj.
+GPU_VERTEX_SHADER = """
+#version 120
+#define MAX_RIPPLES %d
+#define PI 3.14159265358979
+uniform float time;
+uniform float grid_scale;           // size / grid_range
+uniform float wavelength;
+uniform float speed;
+uniform float decay_length;
+uniform float amplitude_cutoff;     // 0 = bez obcinania rippli
+uniform int ripple_count;
+uniform vec4 ripples[MAX_RIPPLES];  // (x0, z0, t0, fade)
+varying vec3 normal;
+varying vec3 position;
+varying vec3 incident;
+
+void main() {
+    float x = gl_Vertex.x;
+    float z = gl_Vertex.z;
+
+    // Podstawowa fala sin(x+t) * cos(z+t) i jej pochodne
+    float sx = sin(x + time);
+    float cx = cos(x + time);
+    float sz = sin(z + time);
+    float cz = cos(z + time);
+    float h = sx * cz;
+    float gx = cx * cz;
+    float gz = -sx * sz;
+
+    // Ripple: A = fade · exp(−r / L) / (1 + 0.1 r), fala = A * sin(2π (r / λ − speed * (t − t0)))
+    float k = 2.0 * PI / wavelength;
+    for (int i = 0; i < MAX_RIPPLES; i++) {
+        if (i >= ripple_count) break;
+        vec4 rp = ripples[i];
+        float dt = time - rp.z;
+        if (dt < 0.0) continue;
+        float dx = x - rp.x;
+        float dz = z - rp.y;
+        float r = sqrt(dx*dx + dz*dz);
+        float inv = 1.0 / (1.0 + 0.1 * r);
+        float A = rp.w * exp(-r / decay_length) * inv;
+        // Poza promieniem wpływu amplituda jest poniżej progu – pomijamy
+        if (abs(A) < amplitude_cutoff) continue;
+        float phase = k * r - 2.0 * PI * speed * dt;
+        float s = sin(phase);
+        float c = cos(phase);
+        h += A * s;
+        if (r > 0.0) {
+            float dh_dr = A * (k * c - (0.1 * inv + 1.0 / decay_length) * s);
+            gx += dh_dr * dx / r;
+            gz += dh_dr * dz / r;
+        }
+    }
+
+    vec4 v = vec4(x * grid_scale, h, z * grid_scale, 1.0);
+    normal = normalize(gl_NormalMatrix * normalize(vec3(-gx, 1.0, -gz)));
+    position = vec3(gl_ModelViewMatrix * v);
+    incident = normalize(position);
+    gl_Position = gl_ModelViewProjectionMatrix * v;
+}
+""" % MAX_GPU_RIPPLES
+
+# Programy linkowane raz; binarki trafiają do .shader_cache, jeśli sterownik pozwala
+shader_manager = ShaderManager()
 
-# ---- Parametry fali radialnej ----
-WAVELENGTH = 5.0
-SPEED = 1.0
+def compile_shader(vertex_source=VERTEX_SHADER):
+    return shader_manager.program(vertex_source, FRAGMENT_SHADER)
 
-# Maksymalny czas życia ripple’a (w klatkach)
-MAX_LIFETIME = 100
+# Parametry fali radialnej (WAVELENGTH, SPEED) i MAX_LIFETIME są w heightfield.py
 
-# Lista aktywnych „rippli” (fala radialna). Każdy to (x0, z0, t0, frame0)
-ripples = []
+# Aktywne „ripple” (fala radialna): x0, z0, t0, frame0 w tablicach.
+# Wygaszane raz na klatkę przez ripples.update(frame_count) w draw_scene.
+# Pula ma stałą pojemność (tyle, ile mieści tablica uniformów w trybie „gpu”);
+# szybkie kliknięcia w jedno miejsce łączą się w jeden silniejszy ripple.
+ripples = RippleStore(capacity=MAX_GPU_RIPPLES)
 
-# Licznik klatek (ticks). Zaczynamy od zera.
+# Zegar symulacji o stałym kroku: time_val i frame_count wynikają z czasu
+# rzeczywistego (sim_clock.now, sim_clock.frame), a nie z liczby narysowanych klatek.
+# Domyślny SIM_STEP = 0.03 to 60 Hz przy prędkości odniesienia; np. SIM_STEP = 0.06 → 30 Hz.
+sim_clock = SimClock(SIM_STEP)
+
+# Czas w klatkach odniesienia (0.03 jednostki czasu), do wygaszania rippli
 frame_count = 0
 
-def base_wave_function(x, z, t):
-    """Podstawowa fala (sin(x+t) * cos(z+t))."""
-    return math.sin(x + t) * math.cos(z + t)
+# Woda liczona tylko w krokach zegara, a rysowana jako mieszanka dwóch ostatnich
+# stanów (tryb "cpu" bez LOD, wątku i procesów) – kosztowna aktualizacja może iść
+# rzadziej niż rysowanie, np. 30 Hz przy 60+ FPS
+WATER_INTERPOLATED = False
+
+# Dwa ostatnie stany siatki po (grid_range, spacing)
+interpolated_states = {}
+
+# Siatki wody w VBO (pocięte na kafle), po jednej na zestaw (size, grid_range, spacing)
+water_meshes = {}
+
+# Tryb liczenia fali: "cpu" (NumPy + upload wysokości) albo "gpu" (vertex shader)
+WATER_MODE = "cpu"
+
+# Model fali podstawowej pod ripplami (tryby "cpu" i LOD; "gpu" liczy zawsze sin · cos):
+# "analytic" – sin(x+t) * cos(z+t), "fft" – ocean z widma Phillipsa (ocean_fft.py)
+WAVE_MODEL = "analytic"
+
+# Oceany FFT po odstępie siatki (próbki FFT pokrywają się z punktami siatki)
+ocean_models = {}
+
+# Fala "analytic" z cache’u jednego okresu (wave_cache.py): co klatkę tylko interpolacja
+# między zapisanymi klatkami, liczone są wyłącznie ripple. Budżet pamięci i liczba
+# klatek na okres – w BaseWaveCache.
+WAVE_CACHE = False
+wave_cache = BaseWaveCache()
+
+# Model rippli (tryby "cpu" i LOD; w trybie "gpu" zawsze analityczne):
+# "analytic" – suma fal radialnych z RippleStore, koszt rośnie z liczbą rippli;
+# "solver" – kliknięcia to impulsy w tłumionym równaniu falowym (wave_solver.py),
+# stały koszt klatki
+RIPPLE_MODEL = "analytic"
+
+# Solvery równania falowego po (grid_range, spacing)
+wave_solvers = {}
+
+# Symulacja wody w osobnym wątku (tylko tryb "cpu" bez LOD): wątek liczy całą
+# siatkę do jednego z dwóch buforów, pętla rysuje ostatni gotowy. Kliknięcia
+# idą do wątku kolejką; ripple i solver należą wtedy wyłącznie do wątku.
+WATER_THREADED = False
+
+# Wątki symulacji po (grid_range, spacing)
+sim_workers = {}
 
-def radial_ripple_contribution(x, z, t, ripple):
+# Liczba procesów liczących wodę (tryb "cpu" bez LOD i bez wątku; 0 – wyłączone).
+# Dla dużych siatek (1024² i więcej) pasy siatki liczy pula procesów prosto do
+# pamięci współdzielonej, z której wysyłamy wierzchołki bez kopiowania.
+WATER_PROCESSES = 0
+
+# Czasy faz klatki (F3 – nakładka z p50/p99); WATER_PROFILE_CSV=plik.csv zapisuje
+# każdą klatkę do pliku
+profiler = FrameProfiler(csv_path=os.environ.get("WATER_PROFILE_CSV"))
+
+def base_wave_model(grid_range, spacing, time_val, cached=True):
     """
-    Jeden „ripple” (fala radialna). 
-    ripple = (x0, z0, t0, frame0).
-    Wzór:
-       r = sqrt((x - x0)^2 + (z - z0)^2)
-       A = 1 / (1 + 0.1 * r)
-       fala = A * sin(2π (r / WAVELENGTH − SPEED * (t − t0)))
+    (base, amplitude): funkcja (X, Z, t) -> (h, dh/dx, dh/dz) wg WAVE_MODEL i ograniczenie |h|
+    w chwili time_val.
+    cached=False pomija WAVE_CACHE (np. gdy funkcja idzie do innego procesu).
     """
-    x0, z0, t0, frame0 = ripple
-    dt = t - t0
-    if dt < 0:
-        return 0.0
-    dx = x - x0
-    dz = z - z0
-    r = math.sqrt(dx*dx + dz*dz)
-    A = 1.0 / (1.0 + 0.1 * r)
-    phase = 2 * math.pi * (r / WAVELENGTH - SPEED * dt)
-    return A * math.sin(phase)
-
-def combined_wave(x, z, t):
+    if WAVE_MODEL == "fft":
+        ocean = ocean_models.get(spacing)
+        if ocean is None:
+            ocean = OceanFFT(spacing=spacing)
+            ocean_models[spacing] = ocean
+        return ocean.wave_with_gradient, ocean.max_height(time_val)
+    if WAVE_CACHE and cached:
+        return wave_cache.for_grid(grid_range, spacing), BASE_WAVE_AMPLITUDE
+    return base_wave_with_gradient, BASE_WAVE_AMPLITUDE
+
+def get_wave_solver(grid_range, spacing):
+    key = (grid_range, spacing)
+    solver = wave_solvers.get(key)
+    if solver is None:
+        solver = WaveSolver(grid_range, spacing)
+        wave_solvers[key] = solver
+    return solver
+
+def earliest_surface_time(grid_range, spacing):
+    """Najwcześniejsza chwila, dla której surface_model da stan – solver nie cofa się w czasie."""
+    if RIPPLE_MODEL == "solver":
+        return get_wave_solver(grid_range, spacing).earliest
+    return float("-inf")
+
+def threaded_simulation():
+    return WATER_THREADED and WATER_MODE == "cpu" and not WATER_LOD
+
+def add_ripple(xg, zg, time_val, frame_count):
+    """Kliknięcie w punkcie siatki (xg, zg); przy symulacji w wątku – przez jego kolejkę."""
+    if threaded_simulation():
+        get_sim_worker(WATER_GRID_RANGE, WATER_SPACING).post((xg, zg, time_val, frame_count))
+    else:
+        apply_ripple(xg, zg, time_val, frame_count)
+
+def apply_ripple(xg, zg, time_val, frame_count):
+    """Ripple w RippleStore albo impuls w solverze."""
+    if RIPPLE_MODEL == "solver" and WATER_MODE != "gpu":
+        get_wave_solver(WATER_GRID_RANGE, WATER_SPACING).impulse(xg, zg)
+    else:
+        ripples.add(xg, zg, time_val, frame_count)
+
+def surface_model(grid_range, spacing, time_val, cached=True):
     """
-    Suma podstawowej fali + wszystkich aktywnych „rippli”, 
-    z liniowym wygaszaniem amplitudy ripple’a w ciągu MAX_LIFETIME klatek.
+    (base, amplitude, active) dla siatek CPU: funkcja fali pod ripplami, ograniczenie |h|
+    i ripple do zsumowania. W trybie "solver" pole u jest doliczane do fali
+    podstawowej, a lista rippli jest pusta.
     """
-    global ripples, frame_count
-    y = base_wave_function(x, z, t)
-    
-    still_active = []
-    for ripple in ripples:
-        x0, z0, t0, frame0 = ripple
-        age_frames = frame_count - frame0
-        
-        # Jeśli ripple nie przekroczył maksymalnej żywotności:
-        if age_frames < MAX_LIFETIME:
-            # Obliczamy „fade factor” liniowo malejący od 1.0 do 0.0
-            fade = 1.0 - (age_frames / MAX_LIFETIME)
-            contrib = radial_ripple_contribution(x, z, t, ripple)
-            y += fade * contrib
-            still_active.append(ripple)
-        # Po MAX_LIFETIME klatkach ripple jest usuwane (nie kopiujemy do still_active)
-    
-    # Odświeżamy listę rippli
-    ripples = still_active
-    return y
-
-def frange(start, stop, step):
-    while start < stop:
-        yield round(start, 5)
-        start += step
+    base, amplitude = base_wave_model(grid_range, spacing, time_val, cached)
+    if RIPPLE_MODEL == "solver":
+        solver = get_wave_solver(grid_range, spacing)
+        solver.advance(time_val)
+        return partial(solver.combined_with_gradient, base=base), amplitude + solver.amplitude, NO_RIPPLES
+    return base, amplitude, ripples.view
+
+def simulate_full_grid(grid_range, spacing, time_val):
+    """Cała siatka w chwili time_val: (heights, normals, amplitude, liczba rippli)."""
+    base, amplitude, active = surface_model(grid_range, spacing, time_val)
+    h, gx, gz = culled_wave_with_gradient(grid_range, spacing, time_val, active, base=base)
+    return h, normals_from_gradient(gx, gz), amplitude, len(active.x0)
+
+def simulate_water_frame(grid_range, spacing, request, events, heights, normals):
+    """
+    Krok wątku symulacji: kliknięcia z kolejki, wygaszanie rippli i cała siatka
+    (wysokości + normalne) do bufora. Zwraca info (time_val, amplitude, ripple).
+    """
+    time_val, frame = request
+    for event in events:
+        apply_ripple(*event)
+    ripples.update(frame)
+    heights[...], normals[...], amplitude, count = simulate_full_grid(grid_range, spacing, time_val)
+    return time_val, amplitude, count
+
+def get_sim_worker(grid_range, spacing):
+    key = (grid_range, spacing)
+    worker = sim_workers.get(key)
+    if worker is None:
+        X, _ = grid_coords(grid_range, spacing)
+        worker = SimulationWorker(X.shape, partial(simulate_water_frame, grid_range, spacing))
+        sim_workers[key] = worker
+    return worker
+
+def close_sim_workers():
+    """Zatrzymuje wątki symulacji i pule procesów (przy wyjściu z programu)."""
+    for worker in sim_workers.values():
+        worker.close()
+    sim_workers.clear()
+    for key in [key for key in water_meshes if key[0] == "processes"]:
+        water_meshes.pop(key).delete()
+
+def get_water_tiles(size, grid_range, spacing, gpu=False):
+    key = ("gpu" if gpu else "cpu", size, grid_range, spacing)
+    tiles = water_meshes.get(key)
+    if tiles is None:
+        tiles = WaterTiles(size, grid_range, spacing, gpu=gpu)
+        water_meshes[key] = tiles
+    return tiles
+
+def visible_water_tiles(tiles, active, base_amplitude=BASE_WAVE_AMPLITUDE):
+    """Kafle w bryle widzenia bieżącej kamery (macierze z chwili rysowania wody)."""
+    modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
+    projection = glGetDoublev(GL_PROJECTION_MATRIX)
+    visible = tiles.visible(modelview, projection, active, base_amplitude)
+    profiler.count("tiles", len(visible))
+    return visible
 
 def draw_water_reflective(size=100.0, time_val=0.0, grid_range=10, spacing=1.0):
-    xs = list(frange(-grid_range, grid_range, spacing))
-    zs = list(frange(-grid_range, grid_range, spacing))
-
-    glUseProgram(shader_program)
+    tiles = get_water_tiles(size, grid_range, spacing)
+    # Wysokość i analityczny gradient liczone raz na punkt siatki, tylko dla kafli
+    # w bryle widzenia; każdy kafel sumuje tylko ripple, które do niego sięgają
+    with profiler.phase("mesh"):
+        base, amplitude, active = surface_model(grid_range, spacing, time_val)
+        visible = visible_water_tiles(tiles, active, amplitude)
+        results = tiles.simulate(visible, time_val, active, base=base)
+
+    with profiler.phase("gl"):
+        # Jeden upload wysokości i normalnych na widoczny kafel (indeksy są stałe)
+        for mesh, heights, normals in results:
+            mesh.update(heights, normals)
+        submit_water(tiles.meshes(visible), time_val)
+
+def draw_water_threaded(size=100.0, time_val=0.0, grid_range=10, spacing=1.0):
+    """
+    Jak draw_water_reflective, ale wysokości liczy wątek symulacji: zlecamy klatkę
+    time_val i rysujemy ostatni gotowy bufor (zwykle z poprzedniej klatki).
+    Kafle poza bryłą widzenia nie są wysyłane; wątek liczy całą siatkę.
+    """
+    tiles = get_water_tiles(size, grid_range, spacing)
+    worker = get_sim_worker(grid_range, spacing)
+    with profiler.phase("mesh"):
+        worker.submit((time_val, frame_count))
+        if worker.buffers.front is None:
+            worker.wait()
+
+    with profiler.phase("gl"):
+        with worker.buffers.read() as (heights, normals, (sim_time, amplitude, count)):
+            profiler.count("ripples", count)
+            visible = visible_water_tiles(tiles, NO_RIPPLES, amplitude)
+            for mesh, h, n in tiles.split(visible, heights, normals):
+                mesh.update(h, n)
+        submit_water(tiles.meshes(visible), sim_time)
+
+def draw_water_interpolated(size=100.0, grid_range=10, spacing=1.0):
+    """
+    Jak draw_water_reflective, ale siatkę liczymy tylko w krokach sim_clock (czasy
+    time − step i time) i rysujemy mieszankę obu stanów z wagą sim_clock.alpha.
+    """
+    tiles = get_water_tiles(size, grid_range, spacing)
+    key = (grid_range, spacing)
+    state = interpolated_states.get(key)
+    if state is None:
+        state = InterpolatedState()
+        interpolated_states[key] = state
+
+    with profiler.phase("mesh"):
+        step_time = sim_clock.time
+        if state.time != step_time:
+            times = [step_time]
+            # Po przeskoku o więcej niż krok oba stany liczymy od nowa
+            if state.time is None or step_time - state.time > 1.5 * sim_clock.step:
+                state = interpolated_states[key] = InterpolatedState()
+                times.insert(0, step_time - sim_clock.step)
+            for t in times:
+                # Chwil, do których solver już nie wróci (był liczony dalej w innym
+                # trybie), nie liczymy – zostaje sam nowszy stan, bez mieszania
+                if t < earliest_surface_time(grid_range, spacing):
+                    continue
+                heights, normals, amplitude, _ = simulate_full_grid(grid_range, spacing, t)
+                state.push(t, heights, normals, amplitude)
+        if state.time is None:
+            return
+        heights, normals, amplitude = state.blend(sim_clock.alpha)
+        normals = normals / np.linalg.norm(normals, axis=-1, keepdims=True)
+        visible = visible_water_tiles(tiles, NO_RIPPLES, amplitude)
+
+    with profiler.phase("gl"):
+        for mesh, h, n in tiles.split(visible, heights, normals):
+            mesh.update(h, n)
+        submit_water(tiles.meshes(visible), step_time - sim_clock.step * (1.0 - sim_clock.alpha))
+
+def draw_water_parallel(size=100.0, time_val=0.0, grid_range=10, spacing=1.0):
+    """
+    Jak draw_water_reflective, ale widoczne pasy siatki liczy WATER_PROCESSES procesów
+    (parallel_heightfield.py); wynik leży już w buforach wierzchołków, więc zostaje upload.
+    """
+    key = ("processes", size, grid_range, spacing, WATER_PROCESSES)
+    water = water_meshes.get(key)
+    if water is None:
+        water = ParallelWater(size, grid_range, spacing, workers=WATER_PROCESSES)
+        water_meshes[key] = water
+
+    with profiler.phase("mesh"):
+        # Bez cache’u fali: sin · cos i tak liczą procesy, a inne modele (FFT, solver)
+        # ParallelWater liczy raz do pamięci współdzielonej
+        base, amplitude, active = surface_model(grid_range, spacing, time_val, cached=False)
+        visible = visible_water_tiles(water, active, amplitude)
+        water.simulate(visible, time_val, active, base=base)
+
+    with profiler.phase("gl"):
+        water.upload(visible)
+        submit_water(water.meshes(visible), time_val)
+
+def submit_water(meshes, time_val):
+    shader_program.use()
     
-    # Przekazanie uniformu „time”
-    loc_time = glGetUniformLocation(shader_program, "time")
-    glUniform1f(loc_time, time_val)
+    # Przekazanie uniformu „time” (lokalizacje w cache, wysyłka tylko przy zmianie)
+    shader_program.uniform1f("time", time_val)
     
     # Bindowanie cubemap
     glActiveTexture(GL_TEXTURE0)
     glBindTexture(GL_TEXTURE_CUBE_MAP, skybox_tex)
-    loc_cube = glGetUniformLocation(shader_program, "cubemap")
-    glUniform1i(loc_cube, 0)
+    shader_program.uniform1i("cubemap", 0)
 
     glEnable(GL_BLEND)
     glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
-    eps = spacing * 0.5  # mały krok do obliczeń pochodnych
-    def normal_at(x, z):
-        # dHeight/dx
-        h_x1 = combined_wave(x + eps, z, time_val)
-        h_x0 = combined_wave(x - eps, z, time_val)
-        dx = (h_x1 - h_x0) / (2 * eps)
-        # dHeight/dz
-        h_z1 = combined_wave(x, z + eps, time_val)
-        h_z0 = combined_wave(x, z - eps, time_val)
-        dz = (h_z1 - h_z0) / (2 * eps)
-        nx = -dx
-        ny = 1.0
-        nz = -dz
-        length = math.sqrt(nx*nx + ny*ny + nz*nz)
-        if length == 0:
-            return (0.0, 1.0, 0.0)
-        return (nx/length, ny/length, nz/length)
-
-    glBegin(GL_TRIANGLES)
-    for i in range(len(xs)-1):
-        for j in range(len(zs)-1):
-            x0, x1 = xs[i], xs[i+1]
-            z0, z1 = zs[j], zs[j+1]
-
-            # Wysokości w czterech rogach kwadratu
-            y00 = combined_wave(x0, z0, time_val)
-            y10 = combined_wave(x1, z0, time_val)
-            y11 = combined_wave(x1, z1, time_val)
-            y01 = combined_wave(x0, z1, time_val)
-
-            n00 = normal_at(x0, z0)
-            n10 = normal_at(x1, z0)
-            n11 = normal_at(x1, z1)
-            n01 = normal_at(x0, z1)
-
-            sx0 = x0 * size / grid_range; sx1 = x1 * size / grid_range
-            sz0 = z0 * size / grid_range; sz1 = z1 * size / grid_range
-
-            # Pierwszy trójkąt
-            glNormal3f(*n00); glVertex3f(sx0, y00, sz0)
-            glNormal3f(*n10); glVertex3f(sx1, y10, sz0)
-            glNormal3f(*n11); glVertex3f(sx1, y11, sz1)
-            # Drugi trójkąt
-            glNormal3f(*n00); glVertex3f(sx0, y00, sz0)
-            glNormal3f(*n11); glVertex3f(sx1, y11, sz1)
-            glNormal3f(*n01); glVertex3f(sx0, y01, sz1)
-    glEnd()
+    for mesh in meshes:
+        mesh.draw()
+
+    glDisable(GL_BLEND)
+    glUseProgram(0)
+
+def draw_water_lod(size=100.0, time_val=0.0, grid_range=10, spacing=1.0, camera_x=0.0, camera_z=0.0):
+    """
+    Ocean z clipmapy: pierścienie wokół kamery (camera_x, camera_z w jednostkach siatki),
+    odstęp siatki rośnie dwukrotnie na pierścień. size / grid_range to skala świata
+    jak w draw_water_reflective; zasięg zależy od WATER_LOD_LEVELS, a nie od grid_range.
+    """
+    key = ("lod", size / grid_range, spacing, WATER_LOD_LEVELS, WATER_LOD_QUADS)
+    clipmap = water_meshes.get(key)
+    if clipmap is None:
+        clipmap = ClipmapWater(spacing, WATER_LOD_LEVELS, WATER_LOD_QUADS, scale=size / grid_range)
+        water_meshes[key] = clipmap
+
+    with profiler.phase("mesh"):
+        clipmap.recenter(camera_x, camera_z)
+        base, _, active = surface_model(grid_range, spacing, time_val)
+        results = clipmap.simulate(time_val, active, base=base)
+
+    with profiler.phase("gl"):
+        for mesh, heights, normals in results:
+            mesh.update(heights, normals)
+        ox, oz = clipmap.offset()
+        glPushMatrix()
+        glTranslatef(ox, 0.0, oz)
+        submit_water(clipmap.meshes(), time_val)
+        glPopMatrix()
+
+def draw_water_gpu(size=100.0, time_val=0.0, grid_range=10, spacing=1.0):
+    """
+    Tryb „gpu”: płaska siatka wysłana raz do VBO, a fala liczona w vertex shaderze.
+    Co klatkę wysyłamy tylko kilka uniformów i tablicę rippli (x0, z0, t0, fade);
+    kafle poza bryłą widzenia nie są rysowane.
+    """
+    active = ripples.view
+    tiles = get_water_tiles(size, grid_range, spacing, gpu=True)
+
+    # Najnowsze ripple, jeśli jest ich więcej niż miejsc w tablicy uniformów
+    with profiler.phase("mesh"):
+        visible = visible_water_tiles(tiles, active)
+        count = min(len(active.x0), MAX_GPU_RIPPLES)
+        ripple_data = np.column_stack(active).astype(np.float32)[len(active.x0) - count:]
+
+    with profiler.phase("gl"):
+        submit_water_gpu(tiles.meshes(visible), time_val, size / grid_range, ripple_data)
+
+def submit_water_gpu(meshes, time_val, grid_scale, ripple_data):
+    program = gpu_shader_program
+    program.use()
+    # Stałe (wavelength, speed, ...) po pierwszej klatce już nie są wysyłane
+    program.uniform1f("time", time_val)
+    program.uniform1f("grid_scale", grid_scale)
+    program.uniform1f("wavelength", WAVELENGTH)
+    program.uniform1f("speed", SPEED)
+    program.uniform1f("decay_length", RIPPLE_DECAY_LENGTH)
+    program.uniform1f("amplitude_cutoff", RIPPLE_AMPLITUDE_CUTOFF)
+    program.uniform1i("ripple_count", len(ripple_data))
+    program.uniform4fv("ripples", ripple_data)
+
+    glActiveTexture(GL_TEXTURE0)
+    glBindTexture(GL_TEXTURE_CUBE_MAP, skybox_tex)
+    program.uniform1i("cubemap", 0)
+
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+    for mesh in meshes:
+        mesh.draw()
 
     glDisable(GL_BLEND)
     glUseProgram(0)
@@ -209,6 +525,12 @@ def draw_water_reflective(size=100.0, time_val=0.0, grid_range=10, spacing=1.0):
 #   Skybox (cubemap) loading & drawing
 # --------------------------------------------------------------------------------
 CUBE_MAP_DIR = "skybox"
+# Rozmiar ścianek wybierany z RESOLUTION_TIERS tak, żeby cubemapa z mipmapami
+# zmieściła się w budżecie pamięci (160 MB -> 2048², 40 MB -> 1024², ...)
+CUBE_MAP_MEMORY_BUDGET = 160 * 1024 * 1024
+CUBE_MAP_SIZE = pick_face_size(CUBE_MAP_MEMORY_BUDGET)
+# Rozmiar podglądu wysyłanego przed pierwszą klatką (pełna wersja dochodzi w tle)
+CUBE_MAP_PREVIEW_SIZE = 128
 CUBE_MAP_FACES = [
     ("woda2.png",  GL_TEXTURE_CUBE_MAP_POSITIVE_X),
     ("woda2.png",  GL_TEXTURE_CUBE_MAP_NEGATIVE_X),
@@ -219,24 +541,8 @@ CUBE_MAP_FACES = [
 ]
 
 def load_cubemap():
-    tex = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_CUBE_MAP, tex)
-    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-
-    size = 2048
-    for fname, face in CUBE_MAP_FACES:
-        path = os.path.join(CUBE_MAP_DIR, fname)
-        surf = pygame.image.load(path).convert()
-        surf = pygame.transform.smoothscale(surf, (size, size))
-        data = pygame.image.tostring(surf, "RGB", True)
-        glTexImage2D(face, 0, GL_RGB, size, size, 0, GL_RGB, GL_UNSIGNED_BYTE, data)
-
-    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_R, GL_CLAMP_TO_EDGE)
-    return tex
+    # Przeskalowane ścianki są trzymane w cache na dysku (klucz: hash pliku + rozmiar)
+    return load_cubemap_texture(CUBE_MAP_FACES, CUBE_MAP_DIR, size=CUBE_MAP_SIZE)
 
 # --------------------------------------------------------------------------------
 #   Poprawiona funkcja: „rozszerzony” skybox bez szczelin między ścianami
@@ -254,84 +560,107 @@ def draw_expanded_skybox(size=500.0, side_offset=500.0, center_y=0.0):
     glEnable(GL_TEXTURE_CUBE_MAP)
     glBindTexture(GL_TEXTURE_CUBE_MAP, skybox_tex)
 
-    cx, cy, cz = 0.0, center_y, 0.0
-    over = 2.0
-    ext = size + side_offset + over  # rozmiar rozszerzony
-
-    def set_cube_texcoord_for_world_vertex(vx, vy, vz):
-        dx, dy, dz = vx, vy, vz
-        length = math.sqrt(dx*dx + dy*dy + dz*dz)
-        if length == 0:
-            glTexCoord3f(0.0, 0.0, 0.0)
-        else:
-            glTexCoord3f(dx / length, dy / length, dz / length)
-
-    glBegin(GL_QUADS)
-    # +X
-    x0 = cx + ext
-    for (dy, dz) in [(-ext, -ext), (-ext, +ext), (+ext, +ext), (+ext, -ext)]:
-        vx, vy, vz = x0, cy + dy, cz + dz
-        set_cube_texcoord_for_world_vertex(vx, vy, vz)
-        glVertex3f(vx, vy, vz)
-    # -X
-    x0 = cx - ext
-    for (dy, dz) in [(-ext, +ext), (-ext, -ext), (+ext, -ext), (+ext, +ext)]:
-        vx, vy, vz = x0, cy + dy, cz + dz
-        set_cube_texcoord_for_world_vertex(vx, vy, vz)
-        glVertex3f(vx, vy, vz)
-    # +Y
-    y0 = cy + size + over
-    for (dx, dz) in [(-ext, +ext), (-ext, -ext), (+ext, -ext), (+ext, +ext)]:
-        vx, vy, vz = cx + dx, y0, cz + dz
-        set_cube_texcoord_for_world_vertex(vx, vy, vz)
-        glVertex3f(vx, vy, vz)
-    # -Y
-    y0 = cy - size - over
-    for (dx, dz) in [(-ext, -ext), (+ext, -ext), (+ext, +ext), (-ext, +ext)]:
-        vx, vy, vz = cx + dx, y0, cz + dz
-        set_cube_texcoord_for_world_vertex(vx, vy, vz)
-        glVertex3f(vx, vy, vz)
-    # +Z
-    z0 = cz + ext
-    for (dx, dy) in [(-ext, -ext), (-ext, +ext), (+ext, +ext), (+ext, -ext)]:
-        vx, vy, vz = cx + dx, cy + dy, z0
-        set_cube_texcoord_for_world_vertex(vx, vy, vz)
-        glVertex3f(vx, vy, vz)
-    # -Z
-    z0 = cz - ext
-    for (dx, dy) in [(-ext, +ext), (+ext, +ext), (+ext, -ext), (-ext, -ext)]:
-        vx, vy, vz = cx + dx, cy + dy, z0
-        set_cube_texcoord_for_world_vertex(vx, vy, vz)
-        glVertex3f(vx, vy, vz)
-    glEnd()
+    # Geometria jest stała: pieczona do VBO raz na zestaw (size, side_offset, center_y)
+    expanded_skybox_mesh(size, side_offset, center_y).draw()
 
     glDisable(GL_TEXTURE_CUBE_MAP)
     glEnable(GL_LIGHTING)
     glDepthMask(GL_TRUE)
 
 # --------------------------------------------------------------------------------
-#   Main application
+#   Scena: inicjalizacja GL i rysowanie jednej klatki (okno i tryb headless)
 # --------------------------------------------------------------------------------
-def main():
-    global skybox_tex, shader_program, frame_count, ripples
 
-    pygame.init()
-    screen_width, screen_height = 1280, 720
-    pygame.display.set_mode((screen_width, screen_height), DOUBLEBUF | OPENGL)
-    pygame.mouse.set_visible(True)  
-    clock = pygame.time.Clock()
+# Parametry siatki wody w scenie
+WATER_SIZE = 80.0
+WATER_GRID_RANGE = 10
+WATER_SPACING = 1.0
+
+# Ocean z pierścieni LOD zamiast jednolitej siatki (tylko tryb "cpu"):
+# WATER_SPACING to odstęp najdrobniejszego pierścienia
+WATER_LOD = False
+WATER_LOD_LEVELS = LOD_LEVELS
+WATER_LOD_QUADS = LOD_RING_QUADS
+
+def init_scene(width, height):
+    """Stan GL, shadery i projekcja. Wymaga aktywnego kontekstu GL."""
+    global shader_program, gpu_shader_program
 
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
     glEnable(GL_LIGHT1)
 
-    skybox_tex = load_cubemap()
     shader_program = compile_shader()
+    if WATER_MODE == "gpu":
+        gpu_shader_program = compile_shader(GPU_VERTEX_SHADER)
+
+    # Skybox pieczony do VBO już tutaj, a nie w pierwszej klatce
+    expanded_skybox_mesh(size=500.0, side_offset=500.0, center_y=0.0)
 
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
-    gluPerspective(60, screen_width / screen_height, 0.1, 3000.0)
+    gluPerspective(60, width / height, 0.1, 3000.0)
+
+def draw_scene(yaw, pitch, time_val):
+    """Jedna klatka: kamera, wygaszanie rippli, skybox i woda (bez flip)."""
+    # Ustawienia kamery
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glRotatef(pitch, 1, 0, 0)
+    glRotatef(yaw,   0, 1, 0)
+
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    # Wygaszanie rippli raz na klatkę (przy symulacji w wątku robi to wątek)
+    if not threaded_simulation():
+        ripples.update(frame_count)
+        profiler.count("ripples", len(ripples.view.x0))
+
+    # === RYSUJEMY SKYBOX ===
+    with profiler.phase("gl"):
+        draw_expanded_skybox(size=500.0, side_offset=500.0, center_y=0.0)
+
+    # === RYSUJEMY WODĘ ===
+    glDisable(GL_LIGHTING)
+    glPushMatrix()
+    # Przesuwamy wodę w dół o 60 jednostek (płaszczyzna y = -60)
+    glTranslatef(0, -35, 0)
+    if WATER_MODE == "gpu":
+        draw_water_gpu(size=WATER_SIZE, time_val=time_val, grid_range=WATER_GRID_RANGE, spacing=WATER_SPACING)
+    elif WATER_LOD:
+        # Kamera stoi w początku układu, więc pierścienie są wokół (0, 0)
+        draw_water_lod(size=WATER_SIZE, time_val=time_val, grid_range=WATER_GRID_RANGE, spacing=WATER_SPACING)
+    elif WATER_THREADED:
+        draw_water_threaded(size=WATER_SIZE, time_val=time_val, grid_range=WATER_GRID_RANGE, spacing=WATER_SPACING)
+    elif WATER_INTERPOLATED:
+        draw_water_interpolated(size=WATER_SIZE, grid_range=WATER_GRID_RANGE, spacing=WATER_SPACING)
+    elif WATER_PROCESSES:
+        draw_water_parallel(size=WATER_SIZE, time_val=time_val, grid_range=WATER_GRID_RANGE, spacing=WATER_SPACING)
+    else:
+        draw_water_reflective(size=WATER_SIZE, time_val=time_val, grid_range=WATER_GRID_RANGE, spacing=WATER_SPACING)
+    glPopMatrix()
+    glEnable(GL_LIGHTING)
+
+# --------------------------------------------------------------------------------
+#   Main application
+# --------------------------------------------------------------------------------
+def main():
+    global skybox_tex, frame_count
+
+    pygame.init()
+    screen_width, screen_height = 1280, 720
+    pygame.display.set_mode((screen_width, screen_height), DOUBLEBUF | OPENGL)
+    pygame.mouse.set_visible(True)  
+    clock = pygame.time.Clock()
+
+    # Najpierw mały podgląd cubemapy, pełna rozdzielczość dochodzi w tle
+    skybox_loader = ProgressiveCubemap(CUBE_MAP_FACES, CUBE_MAP_DIR, CUBE_MAP_SIZE,
+                                       preview_size=CUBE_MAP_PREVIEW_SIZE)
+    skybox_tex = skybox_loader.texture
+    init_scene(screen_width, screen_height)
+    # WATER_GL_TRACE=1: liczniki wywołań GL na klatkę (raport przy wyjściu)
+    gl_tracer = trace_from_env()
 
     yaw = pitch = 0.0
     time_val = 0.0
@@ -342,17 +671,29 @@ def main():
 
     # Główna pętla programu
     while True:
+        profiler.begin_frame()
+        profiler.start("events")
         for e in pygame.event.get():
             # Zamknięcie okna
             if e.type == QUIT:
+                profiler.close()
+                close_trace(gl_tracer)
+                close_sim_workers()
                 pygame.quit()
                 return
 
             # ESC zamyka program
             if e.type == KEYDOWN and e.key == K_ESCAPE:
+                profiler.close()
+                close_trace(gl_tracer)
+                close_sim_workers()
                 pygame.quit()
                 return
 
+            # F3: nakładka z czasami faz klatki
+            if e.type == KEYDOWN and e.key == K_F3:
+                profiler.toggle_hud()
+
             # Przycisk prawej myszy: obrót kamery
             if e.type == MOUSEBUTTONDOWN and e.button == 3:
                 rotating = True
@@ -382,9 +723,9 @@ def main():
                     ix = nx + (fx - nx) * t_plane
                     iz = nz + (fz - nz) * t_plane
                     # Przeliczamy na „grid coordinates”
-                    xg = ix / (80.0 / 10)
-                    zg = iz / (80.0 / 10)
-                    ripples.append((xg, zg, time_val, frame_count))
+                    xg = ix / (WATER_SIZE / WATER_GRID_RANGE)
+                    zg = iz / (WATER_SIZE / WATER_GRID_RANGE)
+                    add_ripple(xg, zg, time_val, frame_count)
 
         # Obrót kamery (mysz prawy przycisk)
         if rotating:
@@ -404,32 +745,27 @@ def main():
         if keys[K_DOWN]:   pitch += 1.0
         pitch = max(-89, min(89, pitch))
 
-        # Ustawienia kamery
-        glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-        glRotatef(pitch, 1, 0, 0)
-        glRotatef(yaw,   0, 1, 0)
-
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        profiler.stop("events")
 
-        # === RYSUJEMY SKYBOX ===
-        draw_expanded_skybox(size=500.0, side_offset=500.0, center_y=0.0)
+        # Co najwyżej jedna ścianka pełnej cubemapy na klatkę
+        with profiler.phase("gl"):
+            skybox_tex = skybox_loader.step()
 
-        # === RYSUJEMY WODĘ ===
-        glDisable(GL_LIGHTING)
-        glPushMatrix()
-        # Przesuwamy wodę w dół o 60 jednostek (płaszczyzna y = -60)
-        glTranslatef(0, -35, 0)
-        draw_water_reflective(size=80.0, time_val=time_val, grid_range=10, spacing=1.0)
-        glPopMatrix()
-        glEnable(GL_LIGHTING)
+        draw_scene(yaw, pitch, time_val)
+        profiler.draw_hud(screen_height)
 
-        pygame.display.flip()
-        clock.tick(60)
+        with profiler.phase("flip"):
+            pygame.display.flip()
+        with profiler.phase("tick"):
+            real_dt = clock.tick(60) / 1000.0
+        profiler.end_frame()
+        if gl_tracer:
+            gl_tracer.end_frame()
 
-        # Po każdym rysowaniu: zwiększamy czas i licznik klatek
-        time_val += 0.03   # animacja „przepływu” czasu
-        frame_count += 1   # o jeden tick więcej
+        # Czas animacji z zegara symulacji – niezależnie od liczby FPS
+        sim_clock.advance(real_dt)
+        time_val = sim_clock.now
+        frame_count = sim_clock.frame
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,170 @@
+import csv
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+# --------------------------------------------------------------------------------
+#   Pomiar czasu faz klatki: kroczące p50/p99, nakładka HUD i zapis do CSV
+# --------------------------------------------------------------------------------
+
+# Domyślne fazy klatki w import.py:
+#   events – obsługa zdarzeń i kamery,  mesh – wysokości + normalne (CPU),
+#   gl – wysyłanie do GL (upload VBO, skybox, draw),  flip – display.flip,
+#   tick – czekanie w clock.tick (zapas do limitu FPS)
+# Liczniki: aktywne ripple i kafle wody w bryle widzenia
+FRAME_PHASES = ("events", "mesh", "gl", "flip", "tick")
+FRAME_COUNTERS = ("ripples", "tiles")
+
+# Co ile klatek odświeżamy tekst HUD (renderowanie czcionki też kosztuje)
+HUD_REFRESH_FRAMES = 15
+
+
+class FrameProfiler:
+    """
+    Zbiera czasy faz każdej klatki (ms) w oknie ostatnich `window` klatek.
+
+        profiler.begin_frame()
+        with profiler.phase("mesh"):
+            ...
+        profiler.start("events")
+        ...
+        profiler.stop("events")
+        profiler.count("ripples", n)
+        profiler.end_frame()
+
+    Ta sama faza użyta kilka razy w klatce sumuje się. Kolumna „frame” to czas
+    od begin_frame do end_frame. Licznik niezgłoszony w danej klatce (np. „tiles”
+    w trybie LOD) ma w niej 0, a nie wartość z wcześniejszej klatki.
+    Z csv_path każda klatka trafia też do pliku CSV.
+    """
+
+    def __init__(self, phases=FRAME_PHASES, counters=FRAME_COUNTERS, window=240, csv_path=None):
+        self.phases = tuple(phases)
+        self.counters = tuple(counters)
+        self.columns = self.phases + ("frame",)
+        self.history = {name: deque(maxlen=window) for name in self.columns + self.counters}
+        self.frame_index = 0
+        self.hud_visible = False
+
+        self._current = dict.fromkeys(self.phases, 0.0)
+        self._counts = dict.fromkeys(self.counters, 0)
+        self._started = {}
+        self._frame_start = None
+
+        self._csv_file = None
+        self._csv = None
+        if csv_path:
+            self._csv_file = open(csv_path, "w", newline="")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(("frame",) + tuple(n + "_ms" for n in self.columns) + self.counters)
+
+        self._font = None
+        self._hud_pixels = None
+        self._hud_size = (0, 0)
+
+    def begin_frame(self):
+        for name in self._current:
+            self._current[name] = 0.0
+        for name in self._counts:
+            self._counts[name] = 0
+        self._frame_start = time.perf_counter()
+
+    def start(self, name):
+        self._started[name] = time.perf_counter()
+
+    def stop(self, name):
+        self._current[name] += time.perf_counter() - self._started.pop(name)
+
+    @contextmanager
+    def phase(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def count(self, name, value):
+        self._counts[name] = value
+
+    def end_frame(self):
+        if self._frame_start is None:
+            return
+        frame_ms = (time.perf_counter() - self._frame_start) * 1000.0
+        self._frame_start = None
+        row = [self._current[name] * 1000.0 for name in self.phases] + [frame_ms]
+        for name, ms in zip(self.columns, row):
+            self.history[name].append(ms)
+        counts = [self._counts[name] for name in self.counters]
+        for name, value in zip(self.counters, counts):
+            self.history[name].append(value)
+
+        if self._csv is not None:
+            self._csv.writerow([self.frame_index] + ["%.4f" % ms for ms in row] + counts)
+        self.frame_index += 1
+
+    def stats(self):
+        """{nazwa: (p50, p99)} z okna kroczącego; dla liczników – wartości, nie ms."""
+        result = {}
+        for name, values in self.history.items():
+            if values:
+                p50, p99 = np.percentile(np.fromiter(values, dtype=float), (50, 99))
+                result[name] = (float(p50), float(p99))
+        return result
+
+    def toggle_hud(self):
+        self.hud_visible = not self.hud_visible
+        self._hud_pixels = None
+
+    def _render_hud(self):
+        if self._font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self._font = pygame.font.Font(None, 20)
+        stats = self.stats()
+        lines = ["%-8s %8s %8s" % ("", "p50", "p99")]
+        for name in self.columns:
+            if name in stats:
+                lines.append("%-8s %8.2f %8.2f" % ((name,) + stats[name]))
+        for name in self.counters:
+            if name in stats:
+                lines.append("%-8s %8.0f %8.0f" % ((name,) + stats[name]))
+
+        rendered = [self._font.render(line, True, (255, 255, 255)) for line in lines]
+        line_h = self._font.get_linesize()
+        width = max(s.get_width() for s in rendered) + 8
+        height = line_h * len(rendered) + 8
+        surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        surf.fill((0, 0, 0, 160))
+        for i, s in enumerate(rendered):
+            surf.blit(s, (4, 4 + i * line_h))
+        self._hud_pixels = pygame.image.tostring(surf, "RGBA", True)
+        self._hud_size = (width, height)
+
+    def draw_hud(self, screen_height, x=10, y=10):
+        """Nakładka w lewym górnym rogu (glWindowPos + glDrawPixels, bez zmiany macierzy)."""
+        if not self.hud_visible:
+            return
+        if self._hud_pixels is None or self.frame_index % HUD_REFRESH_FRAMES == 0:
+            self._render_hud()
+        width, height = self._hud_size
+
+        glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glUseProgram(0)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glWindowPos2i(x, screen_height - y - height)
+        glDrawPixels(width, height, GL_RGBA, GL_UNSIGNED_BYTE, self._hud_pixels)
+        glPopAttrib()
+
+    def close(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv = None
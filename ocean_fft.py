@@ -0,0 +1,124 @@
+import math
+
+import numpy as np
+
+# --------------------------------------------------------------------------------
+#   Ocean z widma (Tessendorf): wysokości z odwrotnej FFT widma Phillipsa,
+#   O(N log N) na klatkę dla siatki N × N
+# --------------------------------------------------------------------------------
+
+GRAVITY = 9.81
+
+# Domyślny rozmiar siatki FFT (potęga dwójki) i wiatr
+OCEAN_FFT_SIZE = 64
+OCEAN_WIND = (1.0, 0.3)
+OCEAN_WIND_SPEED = 6.0
+
+# Średnia kwadratowa wysokości – skala porównywalna z falą podstawową (RMS ≈ 0.5)
+OCEAN_RMS_HEIGHT = 0.4
+
+
+def wave_numbers(n, patch_size):
+    """Wektory falowe (kx, kz) w kolejności wyjścia FFT, tablice (n, n)."""
+    k = 2 * math.pi * np.fft.fftfreq(n, d=patch_size / n)
+    return np.meshgrid(k, k, indexing="ij")
+
+
+def phillips_spectrum(kx, kz, wind=OCEAN_WIND, wind_speed=OCEAN_WIND_SPEED, small_wave=0.0):
+    """
+    Widmo Phillipsa bez stałej A (skalę ustala OceanFFT):
+       P(k) = exp(−1 / (k L)²) / k⁴ · (k̂ · ŵ)² · exp(−k² l²),   L = V² / g
+    Fale płynące pod wiatr są dodatkowo tłumione.
+    """
+    wx, wz = wind
+    norm = math.hypot(wx, wz)
+    wx, wz = wx / norm, wz / norm
+    k2 = kx * kx + kz * kz
+    big = wind_speed * wind_speed / GRAVITY
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_wind = (kx * wx + kz * wz) / np.sqrt(k2)
+        p = np.exp(-1.0 / (k2 * big * big)) / (k2 * k2) * cos_wind * cos_wind
+    p *= np.exp(-k2 * small_wave * small_wave)
+    p[cos_wind < 0] *= 0.07
+    p[k2 == 0] = 0.0
+    return np.nan_to_num(p)
+
+
+def mirror_index(a):
+    """Tablica pod wektorem −k (w kolejności FFT indeks −i to (n − i) mod n)."""
+    return np.roll(np.flip(a, axis=(0, 1)), 1, axis=(0, 1))
+
+
+class OceanFFT:
+    """
+    Powierzchnia oceanu na okresowym kaflu n × n próbek co `spacing` jednostek siatki.
+
+        h(k, t) = h0(k) e^{iωt} + conj(h0(−k)) e^{−iωt},   ω = sqrt(g |k|)
+        h(x, t) = Σ h(k, t) e^{ik·x}     (odwrotna FFT)
+        ∂h/∂x   = Σ i kx h(k, t) e^{ik·x}, analogicznie ∂h/∂z
+
+    Wynik dla danego t liczony jest raz (trzy odwrotne rFFT) i potem tylko
+    próbkowany. Punkty siatki wody trafiają na próbkę (x / spacing, z / spacing)
+    mod n; siatki rzadsze (np. dalsze pierścienie LOD) biorą co któryś punkt.
+    """
+
+    def __init__(self, n=OCEAN_FFT_SIZE, spacing=1.0, wind=OCEAN_WIND, wind_speed=OCEAN_WIND_SPEED,
+                 rms_height=OCEAN_RMS_HEIGHT, seed=0):
+        self.n = n
+        self.spacing = spacing
+        kx, kz = wave_numbers(n, n * spacing)
+        self.kx, self.kz = kx, kz
+        self.omega = np.sqrt(GRAVITY * np.sqrt(kx * kx + kz * kz))
+
+        rng = np.random.default_rng(seed)
+        xi = rng.standard_normal((n, n)) + 1j * rng.standard_normal((n, n))
+        h0 = xi * np.sqrt(phillips_spectrum(kx, kz, wind, wind_speed, small_wave=spacing * 0.5) / 2.0)
+        # Częstotliwość Nyquista (indeks n/2) jest sama dla siebie −k, więc i·k·h nie byłoby
+        # tam hermitowskie i irfft2 zgubiłoby część gradientu – zerujemy ten wiersz i kolumnę
+        if n % 2 == 0:
+            h0[n // 2, :] = 0.0
+            h0[:, n // 2] = 0.0
+        h0_minus = np.conj(mirror_index(h0))
+        # Skalujemy tak, żeby średnia kwadratowa wysokości wynosiła rms_height
+        energy = np.sum(np.abs(h0) ** 2 + np.abs(h0_minus) ** 2)
+        scale = rms_height / math.sqrt(energy) if energy > 0 else 0.0
+        self.h0 = h0 * scale
+        self.h0_minus = h0_minus * scale
+
+        self._t = None
+        self._fields = None
+        self._max_height = 0.0
+
+    def spectrum(self, t):
+        """Widmo h(k, t) – hermitowskie, więc wystarczy rzeczywista odwrotna FFT."""
+        phase = np.exp(1j * self.omega * t)
+        return self.h0 * phase + self.h0_minus * np.conj(phase)
+
+    def fields(self, t):
+        """Wysokość i gradient na całym kaflu (n, n) w chwili t (cache dla ostatniego t)."""
+        if self._t != t:
+            h = self.spectrum(t)
+            n = self.n
+            half = n // 2 + 1
+            # Σ h(k) e^{ikx} = n² · ifft; irfft2 korzysta z połowy widma
+            to_space = lambda spec: np.fft.irfft2(spec[:, :half], s=(n, n)) * (n * n)
+            self._fields = (
+                to_space(h),
+                to_space(1j * self.kx * h),
+                to_space(1j * self.kz * h),
+            )
+            self._max_height = float(np.abs(self._fields[0]).max())
+            self._t = t
+        return self._fields
+
+    def max_height(self, t):
+        """Największe |h| na całym kaflu w chwili t (np. na AABB kafli wody)."""
+        self.fields(t)
+        return self._max_height
+
+    def wave_with_gradient(self, X, Z, t):
+        """Jak base_wave_with_gradient: (h, dh/dx, dh/dz) w punktach siatki (X, Z)."""
+        h, gx, gz = self.fields(t)
+        i = np.rint(np.asarray(X) / self.spacing).astype(np.int64) % self.n
+        j = np.rint(np.asarray(Z) / self.spacing).astype(np.int64) % self.n
+        return h[i, j], gx[i, j], gz[i, j]
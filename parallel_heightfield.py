@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from heightfield import (
+    RIPPLE_AMPLITUDE_CUTOFF,
+    grid_coords, base_wave_with_gradient, culled_block_with_gradient, normals_from_gradient,
+)
+from water_mesh import WaterMesh
+from water_tiles import BASE_WAVE_AMPLITUDE, boxes_in_frustum, frustum_planes, tile_ranges
+
+# --------------------------------------------------------------------------------
+#   Duże siatki wody liczone przez pulę procesów prosto do pamięci współdzielonej
+#   w układzie wierzchołków WaterMesh – upload bez kopiowania
+# --------------------------------------------------------------------------------
+
+# Na ile pasów na proces dzielimy siatkę (więcej pasów = lepsze wyrównanie pracy
+# i dokładniejsze obcinanie do bryły widzenia)
+PARALLEL_BANDS_PER_WORKER = 4
+
+# Układ wierzchołka WaterMesh z normalną: x, y, z, nx, ny, nz (float32)
+VERTEX_FLOATS = 6
+
+# Procesy robocze startują od zera (forkserver albo spawn), a nie przez fork procesu
+# z kontekstem GL i działającymi wątkami
+PARALLEL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Pamięć współdzielona podpięta w procesie roboczym: nazwa -> (segment, tablica)
+_attached = {}
+
+
+def _attach(name, shape, dtype=np.float32):
+    """Tablica z segmentu `name`, podpinana raz na proces roboczy."""
+    entry = _attached.get(name)
+    if entry is None:
+        shm = shared_memory.SharedMemory(name=name)
+        entry = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+        _attached[name] = entry
+    return entry[1]
+
+
+def _evaluate_band(name, shape, grid_range, spacing, rows, t, active, cutoff, field_name):
+    """
+    Proces roboczy: wysokości i normalne wierszy `rows` wpisane w pamięć współdzieloną.
+    Fala podstawowa to sin · cos liczone tutaj albo – gdy field_name nie jest None –
+    gotowe (h, dh/dx, dh/dz) z segmentu field_name, policzone raz w procesie głównym.
+    """
+    vertices = _attach(name, shape)
+    X, Z = grid_coords(grid_range, spacing)
+    base = base_wave_with_gradient
+    if field_name is not None:
+        field = _attach(field_name, (3,) + shape[:2], np.float64)
+        base = lambda X, Z, t: tuple(values[rows].copy() for values in field)
+    heights, grad_x, grad_z = culled_block_with_gradient(X[rows], Z[rows], t, active, cutoff, base=base)
+    band = vertices[rows]
+    band[:, :, 1] = heights
+    band[:, :, 3:6] = normals_from_gradient(grad_x, grad_z)
+
+
+class ParallelWater:
+    """
+    Siatka wody (grid_range, spacing) pocięta na pasy wierszy X, liczona przez
+    ProcessPoolExecutor. Wierzchołki wszystkich pasów leżą w jednym segmencie
+    multiprocessing.shared_memory (nx, nz, 6) float32; pas to ciągły fragment tej
+    pamięci i zarazem bufor wierzchołków swojej WaterMesh, więc procesy piszą
+    wprost do danych, które upload() wysyła do GL.
+
+    Sąsiednie pasy dzielą jeden wiersz (bez szczelin); oba procesy wpisują w niego
+    te same wartości. Ripple są kubełkowane w obrębie pasa jak w culled_block_with_gradient.
+
+    Do procesów idą tylko proste argumenty (nazwy segmentów, zakres wierszy, t,
+    ripple). Fala podstawowa inna niż sin · cos (ocean FFT, pole solvera) jest
+    liczona raz na klatkę w procesie głównym do drugiego segmentu (3, nx, nz),
+    z którego pasy tylko czytają.
+    """
+
+    def __init__(self, size, grid_range, spacing, workers=None, bands=None):
+        X, Z = grid_coords(grid_range, spacing)
+        self.grid_range = grid_range
+        self.spacing = spacing
+        self.workers = workers or os.cpu_count() or 1
+        self.shape = X.shape + (VERTEX_FLOATS,)
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)) * 4)
+        self.vertices = np.ndarray(self.shape, dtype=np.float32, buffer=self.shm.buf)
+        self.vertices.fill(0.0)
+        self.field_shm = shared_memory.SharedMemory(create=True, size=3 * X.size * 8)
+        self.field = np.ndarray((3,) + X.shape, dtype=np.float64, buffer=self.field_shm.buf)
+
+        count = bands or self.workers * PARALLEL_BANDS_PER_WORKER
+        quads = max(1, -(-(X.shape[0] - 1) // count))
+        self.bands = tile_ranges(X.shape[0], quads)
+
+        scale = size / grid_range
+        xs, zs = X[:, 0], Z[0, :]
+        self.band_meshes = [WaterMesh(xs[rows] * scale, zs * scale, vertices=self.vertices[rows])
+                            for rows in self.bands]
+        self.mins = np.array([(xs[rows][0] * scale, 0.0, zs[0] * scale) for rows in self.bands])
+        self.maxs = np.array([(xs[rows][-1] * scale, 0.0, zs[-1] * scale) for rows in self.bands])
+
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        mp_context=multiprocessing.get_context(PARALLEL_START_METHOD))
+
+    def visible(self, modelview, projection, active, base_amplitude=BASE_WAVE_AMPLITUDE):
+        """Indeksy pasów przecinających bryłę widzenia (jak WaterTiles.visible)."""
+        amplitude = base_amplitude + float(np.abs(active.weight).sum())
+        self.mins[:, 1] = -amplitude
+        self.maxs[:, 1] = amplitude
+        mask = boxes_in_frustum(frustum_planes(modelview, projection), self.mins, self.maxs)
+        return np.flatnonzero(mask)
+
+    def simulate(self, indices, t, active, cutoff=RIPPLE_AMPLITUDE_CUTOFF, base=base_wave_with_gradient):
+        """
+        Liczy podane pasy w procesach roboczych i czeka na wszystkie.
+        base inne niż base_wave_with_gradient jest wywoływane tutaj, dla wierszy
+        widocznych pasów, a procesy dostają tylko nazwę segmentu z wynikiem.
+        """
+        field_name = None
+        if base is not base_wave_with_gradient:
+            X, Z = grid_coords(self.grid_range, self.spacing)
+            for i in indices:
+                rows = self.bands[i]
+                self.field[0, rows], self.field[1, rows], self.field[2, rows] = base(X[rows], Z[rows], t)
+            field_name = self.field_shm.name
+        jobs = [self.pool.submit(_evaluate_band, self.shm.name, self.shape, self.grid_range,
+                                 self.spacing, self.bands[i], t, active, cutoff, field_name)
+                for i in indices]
+        for job in jobs:
+            job.result()
+
+    def upload(self, indices):
+        for i in indices:
+            self.band_meshes[i].upload()
+
+    def meshes(self, indices):
+        return [self.band_meshes[i] for i in indices]
+
+    def delete(self):
+        """Zatrzymuje pulę, usuwa VBO i zwalnia pamięć współdzieloną."""
+        self.pool.shutdown()
+        for mesh in self.band_meshes:
+            mesh.delete()
+        # Segment można zamknąć dopiero, gdy nie ma już widoków na jego bufor
+        self.band_meshes = []
+        self.vertices = None
+        self.field = None
+        for shm in (self.shm, self.field_shm):
+            shm.close()
+            shm.unlink()
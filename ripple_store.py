@@ -0,0 +1,120 @@
+import numpy as np
+
+from heightfield import MAX_LIFETIME, ActiveRipples, NO_RIPPLES
+
+# --------------------------------------------------------------------------------
+#   Magazyn rippli: tablice (struct-of-arrays) zamiast listy krotek
+# --------------------------------------------------------------------------------
+
+# Polityki wyrzucania ripple’a, gdy pula jest pełna
+EVICT_OLDEST = "oldest"
+EVICT_LOWEST_ENERGY = "energy"
+
+# Górna granica amplitudy ripple’a powstałego ze scalenia – seria kliknięć w jedno
+# miejsce nie może dać dowolnie wysokiej fali (ani promienia wpływu)
+MAX_MERGED_AMPLITUDE = 2.0
+
+
+class RippleStore:
+    """
+    Ripple trzymane w prealokowanych tablicach x0, z0, t0, frame0, amp + maska aktywności.
+    Wygaszanie robimy raz na klatkę w update(), a ewaluator dostaje gotowy,
+    zwarty widok aktywnych rippli (ActiveRipples) – bez alokacji na wierzchołek.
+
+    Pula ma twardą pojemność: gdy jest pełna, nowy ripple zastępuje najstarszy
+    (EVICT_OLDEST) albo ten z najmniejszą pozostałą energią amp * fade
+    (EVICT_LOWEST_ENERGY). Ripple dodany bliżej niż merge_distance i nie później
+    niż merge_frames klatek po innym aktywnym ripplu łączy się z nim: starszy
+    zachowuje środek, t0 i frame0 (fala nie przeskakuje w fazie, a wygaszanie
+    nie zaczyna się od nowa), a jego amplituda rośnie o nową, najwyżej do
+    max_amplitude. Dzięki temu koszt klatki i wysokość fali są ograniczone,
+    a ciągłe klikanie nie utrzymuje jednego ripple’a w nieskończoność.
+    """
+
+    def __init__(self, capacity=64, max_lifetime=MAX_LIFETIME, eviction=EVICT_OLDEST,
+                 merge_distance=0.5, merge_frames=5, max_amplitude=MAX_MERGED_AMPLITUDE):
+        if eviction not in (EVICT_OLDEST, EVICT_LOWEST_ENERGY):
+            raise ValueError("unknown eviction policy: %r" % (eviction,))
+        self.max_lifetime = max_lifetime
+        self.eviction = eviction
+        self.merge_distance = merge_distance
+        self.merge_frames = merge_frames
+        self.max_amplitude = max_amplitude
+        self.x0 = np.zeros(capacity)
+        self.z0 = np.zeros(capacity)
+        self.t0 = np.zeros(capacity)
+        self.frame0 = np.zeros(capacity)
+        self.amp = np.zeros(capacity)
+        self.seq = np.zeros(capacity, dtype=np.int64)  # kolejność dodania
+        self.active = np.zeros(capacity, dtype=bool)
+        self._next_seq = 0
+        self.view = NO_RIPPLES
+
+    @property
+    def capacity(self):
+        return len(self.active)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.active))
+
+    def _fade(self, frame_count):
+        return np.clip(1.0 - (frame_count - self.frame0) / self.max_lifetime, 0.0, 1.0)
+
+    def _merge_candidate(self, x0, z0, frame0):
+        near = self.active & (frame0 - self.frame0 <= self.merge_frames)
+        if self.merge_distance <= 0 or not near.any():
+            return None
+        d2 = (self.x0 - x0) ** 2 + (self.z0 - z0) ** 2
+        d2[~near] = np.inf
+        slot = int(np.argmin(d2))
+        if d2[slot] > self.merge_distance ** 2:
+            return None
+        return slot
+
+    def _free_slot(self, frame_count):
+        free = np.flatnonzero(~self.active)
+        if free.size:
+            return int(free[0])
+        if self.eviction == EVICT_LOWEST_ENERGY:
+            return int(np.argmin(self.amp * self._fade(frame_count)))
+        return int(np.argmin(self.seq))
+
+    def add(self, x0, z0, t0, frame0, amplitude=1.0):
+        """
+        Dodaje ripple = (x0, z0, t0, frame0) o danej amplitudzie.
+        Zwraca numer miejsca w puli (także gdy ripple został scalony z istniejącym).
+        """
+        slot = self._merge_candidate(x0, z0, frame0)
+        if slot is not None:
+            # Scalenie: biegnąca już fala zostaje, jak była – rośnie tylko amplituda
+            self.amp[slot] = min(self.amp[slot] + amplitude, self.max_amplitude)
+            return slot
+
+        slot = self._free_slot(frame0)
+        self.x0[slot], self.z0[slot] = x0, z0
+        self.t0[slot], self.frame0[slot] = t0, frame0
+        self.amp[slot] = amplitude
+        self.seq[slot] = self._next_seq
+        self._next_seq += 1
+        self.active[slot] = True
+        return slot
+
+    def update(self, frame_count):
+        """
+        Raz na klatkę: usuwa ripple starsze niż max_lifetime klatek i buduje
+        widok aktywnych rippli (w kolejności dodania); waga = amp * „fade factor”.
+        """
+        age = frame_count - self.frame0
+        self.active &= age < self.max_lifetime
+        idx = np.flatnonzero(self.active)
+        if not idx.size:
+            self.view = NO_RIPPLES
+            return self.view
+        idx = idx[np.argsort(self.seq[idx])]
+        fade = 1.0 - age[idx] / self.max_lifetime
+        self.view = ActiveRipples(self.x0[idx], self.z0[idx], self.t0[idx], self.amp[idx] * fade)
+        return self.view
+
+    def clear(self):
+        self.active[:] = False
+        self.view = NO_RIPPLES
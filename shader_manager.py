@@ -0,0 +1,198 @@
+import ctypes
+import hashlib
+import os
+import struct
+import threading
+
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+
+# --------------------------------------------------------------------------------
+#   Programy shaderów: lokalizacje uniformów liczone raz, uniformy wysyłane tylko
+#   przy zmianie wartości i dyskowy cache zlinkowanych binarek (ARB_get_program_binary)
+# --------------------------------------------------------------------------------
+
+SHADER_CACHE_DIR = ".shader_cache"
+
+
+def program_binary_supported():
+    """Czy sterownik umie zapisać i wczytać binarkę programu (co najmniej jeden format)."""
+    if not (bool(glGetProgramBinary) and bool(glProgramBinary)):
+        return False
+    try:
+        return glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS) > 0
+    except GLError:
+        return False
+
+
+def program_key(vertex_source, fragment_source):
+    """
+    Klucz cache: źródła shaderów + sterownik. Binarki są ważne tylko dla tego
+    samego sterownika w tej samej wersji, więc zmiana karty lub aktualizacja
+    po prostu daje nowy klucz (a sterownik i tak może odrzucić starą binarkę).
+    """
+    h = hashlib.sha1()
+    for part in (vertex_source, fragment_source):
+        h.update(part.encode())
+        h.update(b"\0")
+    for name in (GL_VENDOR, GL_RENDERER, GL_VERSION):
+        h.update(glGetString(name) or b"")
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_program_binary(path):
+    """Program z binarki zapisanej przez save_program_binary albo None, gdy się nie da."""
+    try:
+        with open(path, "rb") as f:
+            blob = f.read()
+    except OSError:
+        return None
+    if len(blob) <= 4:
+        return None
+    (binary_format,) = struct.unpack("<I", blob[:4])
+    data = blob[4:]
+
+    program = glCreateProgram()
+    try:
+        glProgramBinary(program, binary_format, data, len(data))
+    except GLError:
+        glDeleteProgram(program)
+        return None
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        glDeleteProgram(program)
+        return None
+    return program
+
+
+def save_program_binary(program, path):
+    length = glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH)
+    if not length:
+        return
+    buffer = (ctypes.c_ubyte * length)()
+    written = GLsizei(0)
+    binary_format = GLenum(0)
+    glGetProgramBinary(program, length, ctypes.byref(written), ctypes.byref(binary_format), buffer)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Jak w cache cubemapy: osobny plik tymczasowy i atomowe os.replace
+    tmp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack("<I", binary_format.value))
+        f.write(bytes(buffer)[:written.value])
+    os.replace(tmp_path, path)
+
+
+def link_program(vertex_source, fragment_source, retrievable=False):
+    vertex = shaders.compileShader(vertex_source, GL_VERTEX_SHADER)
+    fragment = shaders.compileShader(fragment_source, GL_FRAGMENT_SHADER)
+    program = glCreateProgram()
+    glAttachShader(program, vertex)
+    glAttachShader(program, fragment)
+    if retrievable:
+        glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+    glLinkProgram(program)
+    glDetachShader(program, vertex)
+    glDetachShader(program, fragment)
+    glDeleteShader(vertex)
+    glDeleteShader(fragment)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        log = glGetProgramInfoLog(program)
+        glDeleteProgram(program)
+        raise RuntimeError("shader link failed: %s" % (log.decode(errors="replace") if isinstance(log, bytes) else log))
+    return program
+
+
+class ShaderProgram:
+    """
+    Zlinkowany program z pamięcią uniformów:
+      - location(name) pyta sterownik tylko raz na nazwę,
+      - uniform*() wysyła wartość tylko wtedy, gdy różni się od ostatnio wysłanej
+        (wartości uniformów są stanem programu, więc przetrwają glUseProgram(0)).
+    Uniformy nieużywane w shaderze (lokalizacja -1) są po prostu pomijane.
+    """
+
+    def __init__(self, program, from_cache=False):
+        self.program = program
+        self.from_cache = from_cache
+        self._locations = {}
+        self._values = {}
+
+    def use(self):
+        glUseProgram(self.program)
+
+    def location(self, name):
+        loc = self._locations.get(name)
+        if loc is None:
+            loc = glGetUniformLocation(self.program, name)
+            self._locations[name] = loc
+        return loc
+
+    def _changed(self, name, value):
+        if self._values.get(name, None) == value:
+            return False
+        self._values[name] = value
+        return self.location(name) != -1
+
+    def uniform1f(self, name, value):
+        value = float(value)
+        if self._changed(name, value):
+            glUniform1f(self.location(name), value)
+
+    def uniform1i(self, name, value):
+        value = int(value)
+        if self._changed(name, value):
+            glUniform1i(self.location(name), value)
+
+    def uniform4fv(self, name, data):
+        """Tablica vec4 (n, 4); porównujemy bajty, więc ta sama zawartość nie idzie drugi raz."""
+        data = np.ascontiguousarray(data, dtype=np.float32).reshape(-1, 4)
+        if data.size and self._changed(name, data.tobytes()):
+            glUniform4fv(self.location(name), len(data), data)
+
+    def delete(self):
+        glDeleteProgram(self.program)
+        self.program = 0
+
+
+class ShaderManager:
+    """
+    Programy po (vertex, fragment) – każda para linkowana raz na proces.
+    Jeśli sterownik wspiera binarki programów, po pierwszym linkowaniu zapisujemy
+    je w cache_dir i przy kolejnych uruchomieniach pomijamy kompilację.
+    Wymaga aktywnego kontekstu GL.
+    """
+
+    def __init__(self, cache_dir=SHADER_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.programs = {}
+
+    def program(self, vertex_source, fragment_source):
+        key = (vertex_source, fragment_source)
+        if key in self.programs:
+            return self.programs[key]
+
+        use_binary = self.cache_dir is not None and program_binary_supported()
+        path = None
+        program = None
+        if use_binary:
+            path = os.path.join(self.cache_dir, program_key(vertex_source, fragment_source) + ".bin")
+            program = load_program_binary(path)
+        result = ShaderProgram(program, from_cache=True) if program else None
+
+        if result is None:
+            program = link_program(vertex_source, fragment_source, retrievable=use_binary)
+            if use_binary:
+                try:
+                    save_program_binary(program, path)
+                except (OSError, GLError):
+                    pass  # cache jest tylko przyspieszeniem
+            result = ShaderProgram(program)
+
+        self.programs[key] = result
+        return result
+
+    def delete_all(self):
+        for program in self.programs.values():
+            program.delete()
+        self.programs.clear()
@@ -0,0 +1,95 @@
+import math
+
+# --------------------------------------------------------------------------------
+#   Zegar symulacji o stałym kroku: czas symulacji wynika z czasu rzeczywistego,
+#   a nie z liczby narysowanych klatek
+# --------------------------------------------------------------------------------
+
+# Klatka odniesienia: dotąd time_val rósł o 0.03 na klatkę przy 60 FPS. Czasy życia
+# liczone „w klatkach” (MAX_LIFETIME, merge_frames) to teraz czas / REFERENCE_FRAME_TIME.
+REFERENCE_FRAME_TIME = 0.03
+REFERENCE_FPS = 60
+
+# Jednostki czasu symulacji na sekundę – ta sama prędkość animacji co przy 60 FPS
+SIM_TIME_RATE = REFERENCE_FRAME_TIME * REFERENCE_FPS
+
+# Domyślny krok symulacji: jedna klatka odniesienia (60 Hz)
+SIM_STEP = REFERENCE_FRAME_TIME
+
+# Po długiej przerwie (np. przeciąganie okna) nie nadrabiamy więcej kroków niż tyle
+SIM_MAX_STEPS = 8
+
+
+class SimClock:
+    """
+    Akumulator czasu o stałym kroku (step w jednostkach czasu symulacji).
+
+        steps = clock.advance(real_dt)   # ile pełnych kroków wykonać w tej klatce
+        clock.time                       # czas ostatniego kroku
+        clock.alpha                      # ułamek kroku od tego czasu, [0, 1)
+        clock.now                        # time + alpha · step – bieżący czas animacji
+
+    Stan policzony w chwili time − step i time można zmieszać z wagą alpha;
+    rysujemy wtedy z opóźnieniem jednego kroku, ale przy dowolnej liczbie FPS.
+    """
+
+    def __init__(self, step=SIM_STEP, rate=SIM_TIME_RATE, max_steps=SIM_MAX_STEPS):
+        if step <= 0:
+            raise ValueError("simulation step must be positive, got %r" % (step,))
+        self.step = step
+        self.rate = rate
+        self.max_steps = max_steps
+        self.time = 0.0
+        self.accumulator = 0.0
+        self.step_count = 0
+
+    def advance(self, real_dt):
+        """Dodaje real_dt sekund; zwraca liczbę kroków, o które przesunął się time."""
+        self.accumulator += real_dt * self.rate
+        # Mały zapas: 1/60 s · 1.8 nie daje w float dokładnie 0.03
+        steps = math.floor(self.accumulator / self.step + 1e-9)
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.accumulator = steps * self.step
+        self.accumulator = max(0.0, self.accumulator - steps * self.step)
+        self.step_count += steps
+        self.time = self.step_count * self.step
+        return steps
+
+    @property
+    def alpha(self):
+        return min(1.0, self.accumulator / self.step)
+
+    @property
+    def now(self):
+        return self.time + self.accumulator
+
+    @property
+    def frame(self):
+        """Bieżący czas w klatkach odniesienia (zamiast licznika narysowanych klatek)."""
+        return self.now / REFERENCE_FRAME_TIME
+
+
+class InterpolatedState:
+    """
+    Dwa ostatnie stany symulacji (czas, tablice...) i mieszanie liniowe między nimi.
+    Tablice w push() muszą być nowe – przechowujemy referencje, nie kopie.
+    """
+
+    def __init__(self):
+        self.previous = None
+        self.current = None
+
+    @property
+    def time(self):
+        return None if self.current is None else self.current[0]
+
+    def push(self, t, *arrays):
+        self.previous, self.current = self.current, (t, arrays)
+
+    def blend(self, alpha):
+        """previous + (current − previous) · alpha dla każdej tablicy."""
+        arrays = self.current[1]
+        if self.previous is None or alpha >= 1.0:
+            return arrays
+        return tuple(a + (b - a) * alpha for a, b in zip(self.previous[1], arrays))
@@ -0,0 +1,124 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+# --------------------------------------------------------------------------------
+#   Symulacja wody w osobnym wątku: dwa prealokowane bufory wysokości/normalnych,
+#   pętla rysująca zawsze bierze ostatni gotowy
+# --------------------------------------------------------------------------------
+
+
+class HeightBuffers:
+    """
+    Dwa zestawy (heights, normals) o stałym kształcie + opis klatki (info).
+    Wątek symulacji pisze do bufora, który nie jest frontowy, i dopiero po
+    zapisie ogłasza go jako front. Każdy bufor ma własny zamek: czytelnik trzyma
+    go na czas uploadu, więc pisarz nigdy nie nadpisze danych w trakcie odczytu.
+    """
+
+    def __init__(self, shape):
+        self.heights = [np.zeros(shape), np.zeros(shape)]
+        self.normals = [np.zeros(shape + (3,)), np.zeros(shape + (3,))]
+        self.info = [None, None]
+        self.locks = [threading.Lock(), threading.Lock()]
+        self.front = None  # indeks ostatniego gotowego bufora
+
+    def write(self, fill):
+        """fill(heights, normals) -> info wypełnia bufor tylny, który staje się frontowym."""
+        index = 1 if self.front == 0 else 0
+        with self.locks[index]:
+            self.info[index] = fill(self.heights[index], self.normals[index])
+        self.front = index
+
+    @contextmanager
+    def read(self):
+        """(heights, normals, info) ostatniego gotowego bufora (None, jeśli jeszcze nie ma)."""
+        index = self.front
+        if index is None:
+            yield None
+            return
+        with self.locks[index]:
+            yield self.heights[index], self.normals[index], self.info[index]
+
+
+class SimulationWorker:
+    """
+    Wątek liczący kolejne klatki wody.
+
+    step(request, events, heights, normals) -> info  – jeden krok symulacji;
+        request to ostatnie zlecenie z submit() (starsze, nieobsłużone są
+        pomijane), events – zdarzenia z post() od poprzedniego kroku (kliknięcia),
+        w kolejności nadejścia.
+
+    Zdarzenia idą przez queue.SimpleQueue, zlecenie – przez jedno miejsce pod
+    Condition. Wątek rysujący nie czeka na symulację (poza pierwszą klatką,
+    wait()), tylko rysuje HeightBuffers.read(). NumPy zwalnia GIL w większości
+    operacji na tablicach, więc liczenie faktycznie idzie na innym rdzeniu.
+    """
+
+    def __init__(self, shape, step, name="water-simulation"):
+        self.buffers = HeightBuffers(shape)
+        self.events = queue.SimpleQueue()
+        self.completed = 0
+        self.error = None
+        self._step = step
+        self._request = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def post(self, event):
+        self.events.put(event)
+
+    def submit(self, request):
+        """Zlecenie następnej klatki; zastępuje zlecenie, którego wątek jeszcze nie wziął."""
+        self._check()
+        with self._cond:
+            self._request = request
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Czeka na pierwszy gotowy bufor (np. przed pierwszą klatką)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.completed or self.error or self._closed, timeout)
+        self._check()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.thread.join()
+
+    def _check(self):
+        if self.error is not None:
+            raise RuntimeError("simulation worker failed") from self.error
+
+    def _drain_events(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._request is not None or self._closed)
+                if self._closed:
+                    return
+                request, self._request = self._request, None
+            events = self._drain_events()
+            try:
+                self.buffers.write(lambda heights, normals: self._step(request, events, heights, normals))
+            except Exception as exc:
+                with self._cond:
+                    self.error = exc
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self.completed += 1
+                self._cond.notify_all()
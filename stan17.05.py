@@ -1,13 +1,18 @@
-import os
-import math
 import random
 
+import numpy as np
 import pygame
 from pygame.locals import DOUBLEBUF, OPENGL, QUIT, KEYDOWN, K_ESCAPE, K_LEFT, K_RIGHT, K_UP, K_DOWN, MOUSEBUTTONDOWN, MOUSEBUTTONUP
 
 from OpenGL.GL import *
 from OpenGL.GLU import gluPerspective
-from OpenGL.GL import shaders
+
+from heightfield import grid_coords, base_wave_with_gradient
+from water_mesh import WaterMesh
+from cubemap import load_cubemap_texture
+from gl_trace import trace_from_env, close_trace
+from shader_manager import ShaderManager
+from static_geometry import cube_skybox_mesh
 
 # --------------------------------------------------------------------------------
 #   Wave & water with animated cubemap reflection and refraction
@@ -65,78 +70,46 @@ void main() {
 }
 """
 
-def compile_shader():
-    vertex = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
-    fragment = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
-    return shaders.compileProgram(vertex, fragment)
+# linked once per process; program binaries are cached on disk when supported
+shader_manager = ShaderManager()
 
-def wave_function(x, z, t):
-    return math.sin(x + t) * math.cos(z + t)
+def compile_shader():
+    return shader_manager.program(VERTEX_SHADER, FRAGMENT_SHADER)
 
-def frange(start, stop, step):
-    while start < stop:
-        yield round(start, 5)
-        start += step
+water_meshes = {}
 
 def draw_water_reflective(size=100.0, time_val=0.0, grid_range=10, spacing=1.0):
-    xs = list(frange(-grid_range, grid_range, spacing))
-    zs = list(frange(-grid_range, grid_range, spacing))
+    X, Z = grid_coords(grid_range, spacing)
+
+    # height and normal computed once per grid point, for the whole grid at once
+    heights, dx, dz = base_wave_with_gradient(X, Z, time_val)
+    jitter = np.sin(X*12 + Z*9 + time_val*6) * 0.1
+    normals = np.stack((-dx + jitter, np.ones_like(dx), -dz + jitter), axis=-1)
+    normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+
+    # vertex buffer with fixed topology, only heights/normals are streamed
+    key = (size, grid_range, spacing)
+    if key not in water_meshes:
+        scale = size / grid_range
+        water_meshes[key] = WaterMesh(X[:, 0] * scale, Z[0, :] * scale)
+    mesh = water_meshes[key]
+    mesh.update(heights, normals)
 
     # Use shader program
-    glUseProgram(shader_program)
+    shader_program.use()
     
-    # Set time uniform
-    loc_time = glGetUniformLocation(shader_program, "time")
-    glUniform1f(loc_time, time_val)
+    # Set time uniform (location cached, sent only when the value changes)
+    shader_program.uniform1f("time", time_val)
     
     # Bind cubemap texture
     glActiveTexture(GL_TEXTURE0)
     glBindTexture(GL_TEXTURE_CUBE_MAP, skybox_tex)
-    loc_cube = glGetUniformLocation(shader_program, "cubemap")
-    glUniform1i(loc_cube, 0)
+    shader_program.uniform1i("cubemap", 0)
 
     glEnable(GL_BLEND)
     glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
-    eps = spacing
-    def normal_at(x, z):
-        dx = (wave_function(x+eps, z, time_val) - wave_function(x-eps, z, time_val)) / (2*eps)
-        dz = (wave_function(x, z+eps, time_val) - wave_function(x, z-eps, time_val)) / (2*eps)
-        nx, ny, nz = -dx, 1.0, -dz
-        jitter = math.sin(x*12 + z*9 + time_val*6) * 0.1
-        nx += jitter
-        nz += jitter
-        L = math.sqrt(nx*nx + ny*ny + nz*nz)
-        return (nx/L, ny/L, nz/L)
-
-    glBegin(GL_TRIANGLES)
-    for i in range(len(xs)-1):
-        for j in range(len(zs)-1):
-            x0, x1 = xs[i], xs[i+1]
-            z0, z1 = zs[j], zs[j+1]
-
-            y00 = wave_function(x0, z0, time_val)
-            y10 = wave_function(x1, z0, time_val)
-            y11 = wave_function(x1, z1, time_val)
-            y01 = wave_function(x0, z1, time_val)
-
-            n00 = normal_at(x0, z0)
-            n10 = normal_at(x1, z0)
-            n11 = normal_at(x1, z1)
-            n01 = normal_at(x0, z1)
-
-            sx0 = x0 * size / grid_range; sx1 = x1 * size / grid_range
-            sz0 = z0 * size / grid_range; sz1 = z1 * size / grid_range
-
-            # first triangle
-            glNormal3f(*n00); glVertex3f(sx0, y00, sz0)
-            glNormal3f(*n10); glVertex3f(sx1, y10, sz0)
-            glNormal3f(*n11); glVertex3f(sx1, y11, sz1)
-            # second triangle
-            glNormal3f(*n00); glVertex3f(sx0, y00, sz0)
-            glNormal3f(*n11); glVertex3f(sx1, y11, sz1)
-            glNormal3f(*n01); glVertex3f(sx0, y01, sz1)
-    glEnd()
+    mesh.draw()
 
     glDisable(GL_BLEND)
     glUseProgram(0)
@@ -155,21 +128,9 @@ CUBE_MAP_FACES = [
 ]
 
 def load_cubemap():
-    tex = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_CUBE_MAP, tex)
-    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-    size = 1024
-    for fname, face in CUBE_MAP_FACES:
-        path = os.path.join(CUBE_MAP_DIR, fname)
-        surf = pygame.image.load(path).convert()
-        surf = pygame.transform.smoothscale(surf, (size, size))
-        data = pygame.image.tostring(surf, "RGB", True)
-        glTexImage2D(face, 0, GL_RGB, size, size, 0, GL_RGB, GL_UNSIGNED_BYTE, data)
-    for p in (GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER):
-        glTexParameteri(GL_TEXTURE_CUBE_MAP, p, GL_LINEAR)
-    for w in (GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T, GL_TEXTURE_WRAP_R):
-        glTexParameteri(GL_TEXTURE_CUBE_MAP, w, GL_CLAMP_TO_EDGE)
-    return tex
+    # faces are decoded and scaled in parallel (and cached on disk); only the
+    # glTexImage2D uploads run on this thread
+    return load_cubemap_texture(CUBE_MAP_FACES, CUBE_MAP_DIR, size=1024)
 
 def draw_skybox(size=100.0):
     glColor4f(1.0, 1.0, 1.0, 1.0)
@@ -178,38 +139,8 @@ def draw_skybox(size=100.0):
     glEnable(GL_TEXTURE_CUBE_MAP)
     glBindTexture(GL_TEXTURE_CUBE_MAP, skybox_tex)
 
-    glBegin(GL_QUADS)
-    # +X
-    glTexCoord3f( 1,-1,-1); glVertex3f( size,-size,-size)
-    glTexCoord3f( 1, 1,-1); glVertex3f( size, size,-size)
-    glTexCoord3f( 1, 1, 1); glVertex3f( size, size, size)
-    glTexCoord3f( 1,-1, 1); glVertex3f( size,-size, size)
-    # -X
-    glTexCoord3f(-1,-1, 1); glVertex3f(-size,-size, size)
-    glTexCoord3f(-1, 1, 1); glVertex3f(-size, size, size)
-    glTexCoord3f(-1, 1,-1); glVertex3f(-size, size,-size)
-    glTexCoord3f(-1,-1,-1); glVertex3f(-size,-size,-size)
-    # +Y
-    glTexCoord3f(-1, 1,-1); glVertex3f(-size, size,-size)
-    glTexCoord3f(-1, 1, 1); glVertex3f(-size, size, size)
-    glTexCoord3f( 1, 1, 1); glVertex3f( size, size, size)
-    glTexCoord3f( 1, 1,-1); glVertex3f( size, size,-size)
-    # -Y
-    glTexCoord3f(-1,-1, 1); glVertex3f(-size,-size, size)
-    glTexCoord3f( 1,-1, 1); glVertex3f( size,-size, size)
-    glTexCoord3f( 1,-1,-1); glVertex3f( size,-size,-size)
-    glTexCoord3f(-1,-1,-1); glVertex3f(-size,-size,-size)
-    # +Z
-    glTexCoord3f(-1,-1, 1); glVertex3f(-size,-size, size)
-    glTexCoord3f(-1, 1, 1); glVertex3f(-size, size, size)
-    glTexCoord3f( 1, 1, 1); glVertex3f( size, size, size)
-    glTexCoord3f( 1,-1, 1); glVertex3f( size,-size, size)
-    # -Z
-    glTexCoord3f( 1,-1,-1); glVertex3f( size,-size,-size)
-    glTexCoord3f( 1, 1,-1); glVertex3f( size, size,-size)
-    glTexCoord3f(-1, 1,-1); glVertex3f(-size, size,-size)
-    glTexCoord3f(-1,-1,-1); glVertex3f(-size,-size,-size)
-    glEnd()
+    # constant cube, baked into a VBO once per size
+    cube_skybox_mesh(size).draw()
 
     glDisable(GL_TEXTURE_CUBE_MAP)
     glEnable(GL_LIGHTING)
@@ -238,6 +169,9 @@ def main():
     glLoadIdentity()
     gluPerspective(60, 800/600, 0.1, 200.0)
 
+    # WATER_GL_TRACE=1: per-frame GL call counts, reported on exit
+    gl_tracer = trace_from_env()
+
     yaw = pitch = 0.0
     time_val = 0.0
 
@@ -248,6 +182,7 @@ def main():
     while True:
         for e in pygame.event.get():
             if e.type in (QUIT, KEYDOWN) and getattr(e, 'key', None) == K_ESCAPE:
+                close_trace(gl_tracer)
                 pygame.quit()
                 return
             if e.type == MOUSEBUTTONDOWN and e.button == 3:  # right button down
@@ -293,6 +228,8 @@ def main():
         glEnable(GL_LIGHTING)
 
         pygame.display.flip()
+        if gl_tracer:
+            gl_tracer.end_frame()
         clock.tick(60)
         time_val += 0.03
 
@@ -4,15 +4,18 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 import math
 
+import numpy as np
+
+from water_mesh import WaterMesh
+from gl_trace import trace_from_env, close_trace
+from static_geometry import axes_mesh
+
 def wave_function(x, z, time):
-    return math.sin(x + time) * math.cos(z + time)
+    return np.sin(x + time) * np.cos(z + time)
 
 def draw_axes():
-    glBegin(GL_LINES)
-    glColor3f(1, 0, 0); glVertex3f(-2, 0, 0); glVertex3f(2, 0, 0)
-    glColor3f(0, 1, 0); glVertex3f(0, -2, 0); glVertex3f(0, 2, 0)
-    glColor3f(0, 0, 1); glVertex3f(0, 0, -2); glVertex3f(0, 0, 2)
-    glEnd()
+    # Osie w VBO (kolory czerwony/zielony/niebieski), jedno glDrawArrays
+    axes_mesh(2.0).draw()
 
 def frange(start, stop, step):
     while start < stop:
@@ -58,6 +61,8 @@ def main():
     move_speed, rot_speed = 0.3, 1.5
 
     init_lighting()
+    # WATER_GL_TRACE=1: liczniki wywołań GL na klatkę (raport przy wyjściu)
+    gl_tracer = trace_from_env()
 
     rotating = False
     last_mouse = (0, 0)
@@ -65,12 +70,29 @@ def main():
 
     time_val = 0.0
     grid_range, spacing = 5, 0.5
-    x_coords = list(frange(-grid_range, grid_range, spacing))
-    z_coords = list(frange(-grid_range, grid_range, spacing))
+    x_coords = np.array(list(frange(-grid_range, grid_range, spacing)))
+    z_coords = np.array(list(frange(-grid_range, grid_range, spacing)))
+    X, Z = np.meshgrid(x_coords, z_coords, indexing="ij")
+
+    # Siatka w VBO; kolory warstw zależą tylko od odległości od środka,
+    # więc liczymy je raz i trzymamy w osobnych, stałych buforach
+    mesh = WaterMesh(x_coords, z_coords, with_normals=False)
+    layers = [
+        (-0.05, 0.3, lambda f: (0.2, 0.6 * f, 1.0 * f)),
+        (-0.15, 0.6, lambda f: (0.1, 0.4 * f, 0.8 * f)),
+        (-0.30, 1.0, lambda f: (0.05, 0.2 * f, 0.5 * f)),
+    ]
+    maxd = math.hypot(grid_range, grid_range)
+    f = 1 - np.hypot(X, Z) / maxd
+    layer_colors = []
+    for y_off, alpha, color_func in layers:
+        rgba = np.stack(np.broadcast_arrays(*color_func(f), alpha), axis=-1)
+        layer_colors.append((y_off, mesh.add_colors(rgba)))
 
     while True:
         for event in pygame.event.get():
             if event.type == QUIT:
+                close_trace(gl_tracer)
                 pygame.quit()
                 return
             if event.type == MOUSEBUTTONDOWN and event.button == 3:
@@ -112,44 +134,22 @@ def main():
 
         draw_axes()
 
-        points = []
-        for x in x_coords:
-            row = []
-            for z in z_coords:
-                y = wave_function(x, z, time_val)
-                row.append((x, y, z))
-            points.append(row)
+        mesh.update(wave_function(X, Z, time_val))
 
         # rysowanie wody z refleksami
         glPushMatrix()
         glTranslatef(0, -0.1, 0)
-        layers = [
-            (-0.05, 0.3, lambda f: (0.2, 0.6 * f, 1.0 * f)),
-            (-0.15, 0.6, lambda f: (0.1, 0.4 * f, 0.8 * f)),
-            (-0.30, 1.0, lambda f: (0.05, 0.2 * f, 0.5 * f)),
-        ]
-        maxd = math.hypot(grid_range, grid_range)
-        for y_off, alpha, color_func in layers:
+        for y_off, colors in layer_colors:
             glPushMatrix()
             glTranslatef(0, y_off, 0)
-            glBegin(GL_TRIANGLES)
-            for i in range(len(points)-1):
-                for j in range(len(points[i])-1):
-                    A = points[i][j]; B = points[i+1][j]
-                    C = points[i+1][j+1]; D = points[i][j+1]
-                    for tri in [(A, B, C), (A, C, D)]:
-                        for p in tri:
-                            dist = math.hypot(p[0], p[2])
-                            f = 1 - dist/maxd
-                            # kolor podstawowy
-                            glColor4f(*color_func(f), alpha)
-                            glVertex3fv(p)
-            glEnd()
+            mesh.draw(GL_TRIANGLES, colors=colors)
             glPopMatrix()
         glPopMatrix()
 
         glPopMatrix()
         pygame.display.flip()
+        if gl_tracer:
+            gl_tracer.end_frame()
         clock.tick(60)
         time_val += 0.03
 
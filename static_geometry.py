@@ -0,0 +1,178 @@
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+# --------------------------------------------------------------------------------
+#   Stała geometria (skybox, osie) upieczona raz do VBO i rysowana jednym glDrawArrays
+# --------------------------------------------------------------------------------
+
+
+class StaticMesh:
+    """
+    Niezmienna geometria w jednym przeplatanym VBO: pozycja (3) + opcjonalnie
+    współrzędne tekstury (3, cubemapa) i kolor (3 albo 4).
+    Rysowanie to jedno glDrawArrays w trybie `mode` (GL_QUADS, GL_LINES, ...).
+    """
+
+    def __init__(self, mode, vertices, texcoords=None, colors=None):
+        self.mode = mode
+        parts = [np.asarray(vertices, dtype=np.float32).reshape(-1, 3)]
+        self.count = len(parts[0])
+        self.texcoord_offset = self.color_offset = None
+        self.color_size = 0
+        offset = 3
+        if texcoords is not None:
+            parts.append(np.asarray(texcoords, dtype=np.float32).reshape(self.count, 3))
+            self.texcoord_offset = offset * 4
+            offset += 3
+        if colors is not None:
+            colors = np.asarray(colors, dtype=np.float32).reshape(self.count, -1)
+            parts.append(colors)
+            self.color_offset = offset * 4
+            self.color_size = colors.shape[1]
+            offset += self.color_size
+        self.stride = offset * 4
+
+        data = np.ascontiguousarray(np.hstack(parts))
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, self.stride, ctypes.c_void_p(0))
+        if self.texcoord_offset is not None:
+            glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+            glTexCoordPointer(3, GL_FLOAT, self.stride, ctypes.c_void_p(self.texcoord_offset))
+        if self.color_offset is not None:
+            glEnableClientState(GL_COLOR_ARRAY)
+            glColorPointer(self.color_size, GL_FLOAT, self.stride, ctypes.c_void_p(self.color_offset))
+
+        glDrawArrays(self.mode, 0, self.count)
+
+        if self.color_offset is not None:
+            glDisableClientState(GL_COLOR_ARRAY)
+        if self.texcoord_offset is not None:
+            glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        glDeleteBuffers(1, [self.vbo])
+
+
+# Upieczone siatki po kluczu (nazwa, parametry...); ważne dla jednego kontekstu GL
+static_meshes = {}
+
+
+def static_mesh(key, build):
+    """Siatka spod klucza; przy pierwszym użyciu budowana przez build() -> StaticMesh."""
+    mesh = static_meshes.get(key)
+    if mesh is None:
+        mesh = build()
+        static_meshes[key] = mesh
+    return mesh
+
+
+def clear_static_meshes():
+    for mesh in static_meshes.values():
+        mesh.delete()
+    static_meshes.clear()
+
+
+# --------------------------------------------------------------------------------
+#   Geometria: te same wierzchołki, które wcześniej szły przez glBegin/glEnd
+# --------------------------------------------------------------------------------
+
+# Kolejność narożników ścianek w draw_expanded_skybox: (oś, znak, pary współrzędnych)
+_EXPANDED_SKYBOX_FACES = (
+    (0, +1, [(-1, -1), (-1, +1), (+1, +1), (+1, -1)]),  # +X: (dy, dz)
+    (0, -1, [(-1, +1), (-1, -1), (+1, -1), (+1, +1)]),  # -X: (dy, dz)
+    (1, +1, [(-1, +1), (-1, -1), (+1, -1), (+1, +1)]),  # +Y: (dx, dz)
+    (1, -1, [(-1, -1), (+1, -1), (+1, +1), (-1, +1)]),  # -Y: (dx, dz)
+    (2, +1, [(-1, -1), (-1, +1), (+1, +1), (+1, -1)]),  # +Z: (dx, dy)
+    (2, -1, [(-1, +1), (+1, +1), (+1, -1), (-1, -1)]),  # -Z: (dx, dy)
+)
+
+
+def expanded_skybox_quads(size=500.0, side_offset=500.0, center_y=0.0, over=2.0):
+    """
+    Wierzchołki i współrzędne cubemapy „rozszerzonego” skyboxa (24 wierzchołki GL_QUADS).
+    Współrzędna tekstury to znormalizowana pozycja wierzchołka w świecie.
+    """
+    ext = size + side_offset + over
+    center = np.array([0.0, center_y, 0.0])
+    vertices = []
+    for axis, sign, corners in _EXPANDED_SKYBOX_FACES:
+        others = [a for a in range(3) if a != axis]
+        # Ściany Y leżą na wysokości size + over, pozostałe w odległości ext
+        offset = (size + over) if axis == 1 else ext
+        for u, v in corners:
+            p = center.copy()
+            p[axis] += sign * offset
+            p[others[0]] += u * ext
+            p[others[1]] += v * ext
+            vertices.append(p)
+    vertices = np.array(vertices)
+    length = np.linalg.norm(vertices, axis=1, keepdims=True)
+    texcoords = np.divide(vertices, length, out=np.zeros_like(vertices), where=length > 0)
+    return vertices, texcoords
+
+
+# Narożniki ścianek w draw_skybox (stan17.05.py); pozycja = size * współrzędna tekstury
+_CUBE_SKYBOX_TEXCOORDS = (
+    ( 1, -1, -1), ( 1,  1, -1), ( 1,  1,  1), ( 1, -1,  1),   # +X
+    (-1, -1,  1), (-1,  1,  1), (-1,  1, -1), (-1, -1, -1),   # -X
+    (-1,  1, -1), (-1,  1,  1), ( 1,  1,  1), ( 1,  1, -1),   # +Y
+    (-1, -1,  1), ( 1, -1,  1), ( 1, -1, -1), (-1, -1, -1),   # -Y
+    (-1, -1,  1), (-1,  1,  1), ( 1,  1,  1), ( 1, -1,  1),   # +Z
+    ( 1, -1, -1), ( 1,  1, -1), (-1,  1, -1), (-1, -1, -1),   # -Z
+)
+
+
+def cube_skybox_quads(size=100.0):
+    texcoords = np.array(_CUBE_SKYBOX_TEXCOORDS, dtype=np.float32)
+    return texcoords * size, texcoords
+
+
+def axes_lines(length=2.0):
+    """Osie X/Y/Z jako GL_LINES: wierzchołki i kolory (czerwony, zielony, niebieski)."""
+    vertices = []
+    colors = []
+    for axis in range(3):
+        color = [0.0, 0.0, 0.0]
+        color[axis] = 1.0
+        for sign in (-1, 1):
+            p = [0.0, 0.0, 0.0]
+            p[axis] = sign * length
+            vertices.append(p)
+            colors.append(color)
+    return np.array(vertices), np.array(colors)
+
+
+# --------------------------------------------------------------------------------
+#   Upieczone siatki po parametrach – wywołanie w pętli rysującej to tylko lookup
+# --------------------------------------------------------------------------------
+
+def expanded_skybox_mesh(size=500.0, side_offset=500.0, center_y=0.0):
+    def build():
+        vertices, texcoords = expanded_skybox_quads(size, side_offset, center_y)
+        return StaticMesh(GL_QUADS, vertices, texcoords=texcoords)
+    return static_mesh(("expanded_skybox", size, side_offset, center_y), build)
+
+
+def cube_skybox_mesh(size=100.0):
+    def build():
+        vertices, texcoords = cube_skybox_quads(size)
+        return StaticMesh(GL_QUADS, vertices, texcoords=texcoords)
+    return static_mesh(("cube_skybox", size), build)
+
+
+def axes_mesh(length=2.0):
+    def build():
+        vertices, colors = axes_lines(length)
+        return StaticMesh(GL_LINES, vertices, colors=colors)
+    return static_mesh(("axes", length), build)
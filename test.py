@@ -2,25 +2,19 @@ import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
-import math
 
-def wave_function(x, z, time):
-    return math.sin(x + time) * math.cos(z + time)
+import numpy as np
 
-def draw_axes():
-    glBegin(GL_LINES)
-    glColor3f(1, 0, 0)  # X axis - red
-    glVertex3f(-2, 0, 0)
-    glVertex3f(2, 0, 0)
+from water_mesh import WaterMesh
+from gl_trace import trace_from_env, close_trace
+from static_geometry import axes_mesh
 
-    glColor3f(0, 1, 0)  # Y axis - green
-    glVertex3f(0, -2, 0)
-    glVertex3f(0, 2, 0)
+def wave_function(x, z, time):
+    return np.sin(x + time) * np.cos(z + time)
 
-    glColor3f(0, 0, 1)  # Z axis - blue
-    glVertex3f(0, 0, -2)
-    glVertex3f(0, 0, 2)
-    glEnd()
+def draw_axes():
+    # X – czerwona, Y – zielona, Z – niebieska; osie upieczone raz do VBO
+    axes_mesh(2.0).draw()
 
 def frange(start, stop, step):
     while start < stop:
@@ -41,12 +35,20 @@ def main():
     spacing = 0.5   # gęstość siatki
 
     # Pre-wygeneruj współrzędne X i Z
-    x_coords = list(frange(-grid_range, grid_range, spacing))
-    z_coords = list(frange(-grid_range, grid_range, spacing))
+    x_coords = np.array(list(frange(-grid_range, grid_range, spacing)))
+    z_coords = np.array(list(frange(-grid_range, grid_range, spacing)))
+    X, Z = np.meshgrid(x_coords, z_coords, indexing="ij")
+
+    # Siatka w VBO – indeksy budowane raz, co klatkę tylko nowe wysokości
+    mesh = WaterMesh(x_coords, z_coords, with_normals=False)
+
+    # WATER_GL_TRACE=1: liczniki wywołań GL na klatkę (raport przy wyjściu)
+    gl_tracer = trace_from_env()
 
     while True:
         for event in pygame.event.get():
             if event.type == QUIT:
+                close_trace(gl_tracer)
                 return
 
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -56,47 +58,23 @@ def main():
         draw_axes()
 
         # --- Generowanie siatki punktów z y uzależnionym od wave_function
-        points = []
-        for x in x_coords:
-            row = []
-            for z in z_coords:
-                y = wave_function(x, z, time)
-                row.append((x, y, z))
-            points.append(row)
+        mesh.update(wave_function(X, Z, time))
 
         # --- Rysowanie punktów
         glPointSize(5)
-        glBegin(GL_POINTS)
         glColor3f(1, 1, 1)
-        for row in points:
-            for p in row:
-                glVertex3fv(p)
-        glEnd()
+        mesh.draw(GL_POINTS)
 
         # --- Rysowanie powierzchni jako siatka z trójkątów
-        glBegin(GL_TRIANGLES)
         glColor3f(0.3, 0.7, 1)
-        for i in range(len(points) - 1):
-            for j in range(len(points[i]) - 1):
-                A = points[i][j]
-                B = points[i+1][j]
-                C = points[i+1][j+1]
-                D = points[i][j+1]
-
-                # Trójkąty
-                glVertex3fv(A)
-                glVertex3fv(B)
-                glVertex3fv(C)
-
-                glVertex3fv(A)
-                glVertex3fv(C)
-                glVertex3fv(D)
-        glEnd()
+        mesh.draw(GL_TRIANGLES)
 
         glPopMatrix()
         time += 0.03
 
         pygame.display.flip()
+        if gl_tracer:
+            gl_tracer.end_frame()
         clock.tick(60)
 
 if __name__ == "__main__":
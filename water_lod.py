@@ -0,0 +1,135 @@
+import numpy as np
+
+from heightfield import (
+    RIPPLE_AMPLITUDE_CUTOFF, ActiveRipples,
+    base_wave_with_gradient, combined_wave_with_gradient, influence_radius, normals_from_gradient,
+)
+from water_mesh import WaterMesh, grid_indices
+
+# --------------------------------------------------------------------------------
+#   Clipmapa wody: koncentryczne pierścienie wokół kamery, odstęp siatki
+#   podwaja się z każdym pierścieniem
+# --------------------------------------------------------------------------------
+
+# Bok poziomu w kwadratach siatki (wielokrotność 4: dziura w pierścieniu l to
+# dokładnie cały poziom l - 1, czyli połowa boku w dwa razy rzadszej siatce)
+LOD_RING_QUADS = 64
+
+# Liczba poziomów: zasięg rośnie jak 2^levels, liczba wierzchołków – liniowo
+LOD_LEVELS = 5
+
+
+def ring_indices(n, hole):
+    """
+    Trójkąty siatki n × n kwadratów bez kwadratów z dziury [n/4, 3n/4)²
+    (hole=False – pełna siatka, najdrobniejszy poziom).
+    """
+    quads = grid_indices(n + 1, n + 1).reshape(n, n, 6)
+    if hole:
+        lo, hi = n // 4, 3 * n // 4
+        keep = np.ones((n, n), dtype=bool)
+        keep[lo:hi, lo:hi] = False
+        quads = quads[keep]
+    return quads.ravel()
+
+
+def ring_vertex_mask(n, hole):
+    """Wierzchołki używane przez trójkąty poziomu (wnętrze dziury pomijamy w obliczeniach)."""
+    used = np.ones((n + 1, n + 1), dtype=bool)
+    if hole:
+        lo, hi = n // 4, 3 * n // 4
+        used[lo + 1:hi, lo + 1:hi] = False
+    return used
+
+
+def stitch_outer_edge(values):
+    """
+    Usuwa szczeliny (T-złącza) na styku z rzadszym poziomem: nieparzyste wierzchołki
+    zewnętrznej krawędzi leżą w połowie boku większego trójkąta, więc dostają
+    średnią z sąsiadów na krawędzi – dokładnie tam, gdzie przebiega rzadsza siatka.
+    values: (n + 1, n + 1), zmieniane w miejscu.
+    """
+    for edge in (values[0, :], values[-1, :], values[:, 0], values[:, -1]):
+        edge[1:-1:2] = 0.5 * (edge[0:-2:2] + edge[2::2])
+
+
+class ClipmapWater:
+    """
+    levels poziomów po (n + 1)² wierzchołków; poziom l ma odstęp spacing · 2^l.
+    Wszystkie poziomy mają wspólny środek, przyciągany do wielokrotności
+    2 · (odstęp najrzadszego poziomu), dzięki czemu wierzchołki każdego poziomu
+    leżą zawsze w tych samych punktach świata (fala „nie pływa”), a krawędź
+    poziomu l - 1 pokrywa się z brzegiem dziury poziomu l.
+
+    Współrzędne siatki (te same jednostki co fala) mnożymy przez scale;
+    siatki w VBO są lokalne, całość przesuwa się o offset() przy rysowaniu.
+    """
+
+    def __init__(self, spacing=1.0, levels=LOD_LEVELS, n=LOD_RING_QUADS, scale=1.0):
+        if n % 4:
+            raise ValueError("ring size must be a multiple of 4, got %d" % n)
+        self.spacing = spacing
+        self.n = n
+        self.scale = scale
+        self.snap = 2 * spacing * 2 ** (levels - 1)
+        self.center = (0.0, 0.0)
+
+        self.levels = []
+        for level in range(levels):
+            step = spacing * 2 ** level
+            axis = (np.arange(n + 1) - n // 2) * step
+            hole = level > 0
+            mesh = WaterMesh(axis * scale, axis * scale, indices=ring_indices(n, hole))
+            used = ring_vertex_mask(n, hole)
+            X, Z = np.meshgrid(axis, axis, indexing="ij")
+            self.levels.append((mesh, used, X[used], Z[used], axis[-1]))
+
+    @property
+    def vertex_count(self):
+        return sum(int(used.sum()) for _, used, _, _, _ in self.levels)
+
+    @property
+    def extent(self):
+        """Połowa boku całej clipmapy w jednostkach siatki."""
+        return self.levels[-1][4]
+
+    def recenter(self, camera_x, camera_z):
+        s = self.snap
+        self.center = (round(camera_x / s) * s, round(camera_z / s) * s)
+        return self.center
+
+    def offset(self):
+        """Przesunięcie (x, z) w jednostkach świata dla glTranslatef."""
+        return self.center[0] * self.scale, self.center[1] * self.scale
+
+    def simulate(self, t, active, cutoff=RIPPLE_AMPLITUDE_CUTOFF, base=base_wave_with_gradient):
+        """Wysokości i normalne wszystkich poziomów: lista (mesh, heights, normals)."""
+        cx, cz = self.center
+        radius = influence_radius(active.weight, cutoff)
+        n = self.n
+        results = []
+        for index, (mesh, used, X, Z, half) in enumerate(self.levels):
+            # Tylko ripple, których koło wpływu sięga kwadratu poziomu
+            dx = np.maximum(0.0, np.abs(active.x0 - cx) - half)
+            dz = np.maximum(0.0, np.abs(active.z0 - cz) - half)
+            near = dx * dx + dz * dz <= radius * radius
+            subset = ActiveRipples(*(a[near] for a in active))
+            h, gx, gz = combined_wave_with_gradient(X + cx, Z + cz, t, subset, cutoff, base)
+
+            heights = np.zeros((n + 1, n + 1))
+            grad_x = np.zeros((n + 1, n + 1))
+            grad_z = np.zeros((n + 1, n + 1))
+            heights[used], grad_x[used], grad_z[used] = h, gx, gz
+            if index < len(self.levels) - 1:
+                for values in (heights, grad_x, grad_z):
+                    stitch_outer_edge(values)
+            results.append((mesh, heights, normals_from_gradient(grad_x, grad_z)))
+        return results
+
+    def meshes(self):
+        return [mesh for mesh, _, _, _, _ in self.levels]
+
+    def delete(self):
+        for mesh in self.meshes():
+            mesh.delete()
+        self.levels = []
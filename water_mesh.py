@@ -0,0 +1,123 @@
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+# --------------------------------------------------------------------------------
+#   Siatka wody w buforach GPU (VBO + IBO) zamiast glBegin/glEnd
+# --------------------------------------------------------------------------------
+
+
+def grid_indices(nx, nz):
+    """
+    Indeksy trójkątów dla siatki nx × nz; wierzchołek (i, j) ma numer i * nz + j.
+    Każdy kwadrat to dwa trójkąty: (00, 10, 11) i (00, 11, 01) – jak w wersji z glBegin.
+    """
+    i, j = np.meshgrid(np.arange(nx - 1), np.arange(nz - 1), indexing="ij")
+    v00 = i * nz + j
+    v10 = v00 + nz
+    v11 = v10 + 1
+    v01 = v00 + 1
+    return np.stack((v00, v10, v11, v00, v11, v01), axis=-1).astype(np.uint32).ravel()
+
+
+class WaterMesh:
+    """
+    Siatka o stałej topologii: bufor indeksów budujemy raz, a co klatkę wysyłamy
+    tylko nowe wysokości (i normalne) jednym glBufferSubData z ciągłej tablicy float32.
+
+    xs, zs       – współrzędne wierzchołków w osiach X/Z (już w jednostkach świata)
+    with_normals – czy wierzchołek ma też normalną (układ x, y, z, nx, ny, nz)
+    indices      – własne trójkąty (np. pierścień z dziurą); domyślnie cała siatka
+    vertices     – zewnętrzna ciągła tablica float32 (nx, nz, 6 albo 3) na wierzchołki,
+                   np. w pamięci współdzielonej; ktoś inny wpisuje do niej wysokości
+                   i normalne, a upload() wysyła ją bez kopiowania
+    """
+
+    def __init__(self, xs, zs, with_normals=True, indices=None, vertices=None):
+        self.nx, self.nz = len(xs), len(zs)
+        self.with_normals = with_normals
+        floats = 6 if with_normals else 3
+        self.stride = floats * 4
+
+        shape = (self.nx, self.nz, floats)
+        if vertices is None:
+            vertices = np.zeros(shape, dtype=np.float32)
+        elif vertices.shape != shape or vertices.dtype != np.float32 or not vertices.flags.c_contiguous:
+            raise ValueError("vertices must be a contiguous float32 array of shape %s" % (shape,))
+        self.vertices = vertices
+        self.vertices[:, :, 0] = np.asarray(xs, dtype=np.float32)[:, None]
+        self.vertices[:, :, 2] = np.asarray(zs, dtype=np.float32)[None, :]
+        if with_normals:
+            self.vertices[:, :, 4] = 1.0
+
+        if indices is None:
+            indices = grid_indices(self.nx, self.nz)
+        indices = np.ascontiguousarray(indices, dtype=np.uint32)
+        self.index_count = indices.size
+
+        self.vbo, self.ibo = glGenBuffers(2)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        self.color_vbos = []
+
+    def update(self, heights, normals=None):
+        """Wpisuje wysokości (nx, nz) i ewentualnie normalne (nx, nz, 3), jeden upload."""
+        self.vertices[:, :, 1] = heights
+        if normals is not None:
+            self.vertices[:, :, 3:6] = normals
+        self.upload()
+
+    def upload(self):
+        """Wysyła bieżącą zawartość self.vertices (jeden glBufferSubData)."""
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, self.vertices.nbytes, self.vertices)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def add_colors(self, rgba):
+        """Stała warstwa kolorów RGBA (nx, nz, 4); zwraca jej numer do draw(colors=...)."""
+        data = np.ascontiguousarray(rgba, dtype=np.float32)
+        vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.color_vbos.append(vbo)
+        return len(self.color_vbos) - 1
+
+    def draw(self, mode=GL_TRIANGLES, colors=None):
+        """Jedno wywołanie rysujące: glDrawElements dla trójkątów, glDrawArrays dla punktów."""
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, self.stride, ctypes.c_void_p(0))
+        if self.with_normals:
+            glEnableClientState(GL_NORMAL_ARRAY)
+            glNormalPointer(GL_FLOAT, self.stride, ctypes.c_void_p(12))
+        if colors is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, self.color_vbos[colors])
+            glEnableClientState(GL_COLOR_ARRAY)
+            glColorPointer(4, GL_FLOAT, 0, ctypes.c_void_p(0))
+
+        if mode == GL_POINTS:
+            glDrawArrays(GL_POINTS, 0, self.nx * self.nz)
+        else:
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+            glDrawElements(mode, self.index_count, GL_UNSIGNED_INT, ctypes.c_void_p(0))
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+        if colors is not None:
+            glDisableClientState(GL_COLOR_ARRAY)
+        if self.with_normals:
+            glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        glDeleteBuffers(2, [self.vbo, self.ibo])
+        if self.color_vbos:
+            glDeleteBuffers(len(self.color_vbos), self.color_vbos)
+        self.color_vbos = []
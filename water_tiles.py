@@ -0,0 +1,123 @@
+import numpy as np
+
+from heightfield import (
+    RIPPLE_AMPLITUDE_CUTOFF,
+    grid_coords, base_wave_with_gradient, culled_block_with_gradient, normals_from_gradient,
+)
+from water_mesh import WaterMesh
+
+# --------------------------------------------------------------------------------
+#   Woda podzielona na kafle z AABB: kafle poza bryłą widzenia nie są ani
+#   liczone, ani wysyłane do GL
+# --------------------------------------------------------------------------------
+
+# Bok kafla w kwadratach siatki (kafel ma o jeden punkt więcej – sąsiednie
+# kafle współdzielą krawędź, więc między nimi nie ma szczelin)
+WATER_TILE_QUADS = 16
+
+# Największa wysokość samej fali podstawowej |sin · cos| <= 1
+BASE_WAVE_AMPLITUDE = 1.0
+
+
+def frustum_planes(modelview, projection):
+    """
+    Sześć płaszczyzn (a, b, c, d) bryły widzenia w układzie modelu (metoda
+    Gribba–Hartmanna). Macierze jak z glGetDoublev – kolumnami, więc clip = (MV · P)ᵀ.
+    Punkt p jest po wewnętrznej stronie płaszczyzny, gdy a·x + b·y + c·z + d >= 0.
+    """
+    clip = (np.asarray(modelview, dtype=np.float64).reshape(4, 4)
+            @ np.asarray(projection, dtype=np.float64).reshape(4, 4)).T
+    planes = np.array([
+        clip[3] + clip[0], clip[3] - clip[0],   # lewa, prawa
+        clip[3] + clip[1], clip[3] - clip[1],   # dolna, górna
+        clip[3] + clip[2], clip[3] - clip[2],   # bliska, daleka
+    ])
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes
+
+
+def boxes_in_frustum(planes, mins, maxs):
+    """
+    Maska (n,) prostopadłościanów (mins/maxs: (n, 3)), które mogą być widoczne.
+    Dla każdej płaszczyzny bierzemy narożnik najdalej w stronę jej normalnej;
+    jeśli nawet on jest na zewnątrz, cały prostopadłościan jest poza bryłą.
+    """
+    normals = planes[:, None, :3]
+    corner = np.where(normals > 0, maxs[None], mins[None])
+    dist = (corner * normals).sum(axis=-1) + planes[:, None, 3]
+    return (dist >= 0).all(axis=0)
+
+
+def tile_ranges(n, quads=WATER_TILE_QUADS):
+    """Zakresy punktów kafli wzdłuż osi o n punktach; sąsiednie kafle dzielą jeden punkt."""
+    return [slice(k, min(n, k + quads + 1)) for k in range(0, max(1, n - 1), quads)]
+
+
+class WaterTiles:
+    """
+    Siatka wody (grid_range, spacing) pocięta na kafle, każdy z własną WaterMesh.
+
+    gpu=False – wierzchołki w jednostkach świata (× size / grid_range), wysokości
+                i normalne liczone na CPU dla widocznych kafli;
+    gpu=True  – płaskie kafle w jednostkach siatki (fala w vertex shaderze),
+                obcinanie dotyczy wtedy tylko wysyłania.
+
+    AABB kafla w osi Y obejmuje ± (fala podstawowa + suma |wag| rippli), więc
+    kafel z wysoką falą przy krawędzi ekranu nie zniknie przedwcześnie.
+    """
+
+    def __init__(self, size, grid_range, spacing, quads=WATER_TILE_QUADS, gpu=False):
+        self.gpu = gpu
+        X, Z = grid_coords(grid_range, spacing)
+        scale = size / grid_range
+        mesh_scale = 1.0 if gpu else scale
+
+        self.tiles = []
+        self.slices = []
+        mins, maxs = [], []
+        for sx in tile_ranges(X.shape[0], quads):
+            for sz in tile_ranges(X.shape[1], quads):
+                xs, zs = X[sx, 0], Z[0, sz]
+                mesh = WaterMesh(xs * mesh_scale, zs * mesh_scale, with_normals=not gpu)
+                self.tiles.append((X[sx, sz], Z[sx, sz], mesh))
+                self.slices.append((sx, sz))
+                mins.append((xs[0] * scale, 0.0, zs[0] * scale))
+                maxs.append((xs[-1] * scale, 0.0, zs[-1] * scale))
+        self.mins = np.array(mins)
+        self.maxs = np.array(maxs)
+
+    def visible(self, modelview, projection, active, base_amplitude=BASE_WAVE_AMPLITUDE):
+        """
+        Indeksy kafli przecinających bryłę widzenia przy bieżącej amplitudzie
+        (base_amplitude – ograniczenie |h| modelu fali podstawowej).
+        """
+        amplitude = base_amplitude + float(np.abs(active.weight).sum())
+        self.mins[:, 1] = -amplitude
+        self.maxs[:, 1] = amplitude
+        mask = boxes_in_frustum(frustum_planes(modelview, projection), self.mins, self.maxs)
+        return np.flatnonzero(mask)
+
+    def simulate(self, indices, t, active, cutoff=RIPPLE_AMPLITUDE_CUTOFF, base=base_wave_with_gradient):
+        """Wysokości i normalne tylko dla podanych kafli: lista (mesh, heights, normals)."""
+        results = []
+        for i in indices:
+            X, Z, mesh = self.tiles[i]
+            heights, grad_x, grad_z = culled_block_with_gradient(X, Z, t, active, cutoff, base=base)
+            results.append((mesh, heights, normals_from_gradient(grad_x, grad_z)))
+        return results
+
+    def split(self, indices, heights, normals):
+        """Wycinki policzonej już całej siatki (heights, normals) dla podanych kafli."""
+        results = []
+        for i in indices:
+            sx, sz = self.slices[i]
+            results.append((self.tiles[i][2], heights[sx, sz], normals[sx, sz]))
+        return results
+
+    def meshes(self, indices):
+        return [self.tiles[i][2] for i in indices]
+
+    def delete(self):
+        for _, _, mesh in self.tiles:
+            mesh.delete()
+        self.tiles = []
@@ -0,0 +1,132 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from heightfield import base_wave_with_gradient, grid_axis
+
+# --------------------------------------------------------------------------------
+#   Cache animacji fali podstawowej: jeden okres sin(x+t)·cos(z+t) policzony raz,
+#   potem w każdej klatce tylko interpolacja między zapisanymi klatkami
+# --------------------------------------------------------------------------------
+
+# sin(x+t)·cos(z+t) = ½ [sin(x+z+2t) + sin(x−z)], więc okres w t to π, a nie 2π
+BASE_WAVE_PERIOD = math.pi
+
+# Ile klatek na okres (błąd interpolacji liniowej ~ (π / frames)² / 4, przy 64 ok. 6e-4)
+WAVE_CACHE_FRAMES = 64
+
+# Łączny budżet pamięci na wszystkie zestawy (grid_range, spacing)
+WAVE_CACHE_BUDGET = 64 * 1024 * 1024
+
+
+class CachedPeriod:
+    """
+    Wysokość i gradient fali podstawowej na siatce (grid_range, spacing) w `frames`
+    chwilach jednego okresu, float32 (frames, n, n). Klatki liczone leniwie – przy
+    pierwszym użyciu – żeby utworzenie cache’u nie zatrzymywało pierwszej klatki.
+    """
+
+    def __init__(self, grid_range, spacing, frames=WAVE_CACHE_FRAMES):
+        self.axis = grid_axis(grid_range, spacing)
+        self.spacing = spacing
+        self.frames = frames
+        shape = (frames, len(self.axis), len(self.axis))
+        self.heights = np.zeros(shape, dtype=np.float32)
+        self.grad_x = np.zeros(shape, dtype=np.float32)
+        self.grad_z = np.zeros(shape, dtype=np.float32)
+        self.filled = np.zeros(frames, dtype=bool)
+
+    @staticmethod
+    def nbytes_for(grid_range, spacing, frames=WAVE_CACHE_FRAMES):
+        n = len(grid_axis(grid_range, spacing))
+        return 3 * frames * n * n * 4
+
+    @property
+    def nbytes(self):
+        return self.heights.nbytes + self.grad_x.nbytes + self.grad_z.nbytes
+
+    def _fill(self, k):
+        if not self.filled[k]:
+            X, Z = np.meshgrid(self.axis, self.axis, indexing="ij")
+            t = k * BASE_WAVE_PERIOD / self.frames
+            self.heights[k], self.grad_x[k], self.grad_z[k] = base_wave_with_gradient(X, Z, t)
+            self.filled[k] = True
+
+    def _block(self, X, Z):
+        """(slice_x, slice_z), jeśli (X, Z) to prostokątny fragment siatki cache’u, inaczej None."""
+        if np.ndim(X) != 2:
+            return None
+        n = len(self.axis)
+        nx, nz = np.shape(X)
+        i0 = int(round((X[0, 0] - self.axis[0]) / self.spacing))
+        j0 = int(round((Z[0, 0] - self.axis[0]) / self.spacing))
+        if i0 < 0 or j0 < 0 or i0 + nx > n or j0 + nz > n:
+            return None
+        if not (np.array_equal(X[:, 0], self.axis[i0:i0 + nx]) and np.array_equal(Z[0, :], self.axis[j0:j0 + nz])):
+            return None
+        return slice(i0, i0 + nx), slice(j0, j0 + nz)
+
+    def wave_with_gradient(self, X, Z, t):
+        """
+        Jak base_wave_with_gradient: (h, dh/dx, dh/dz), interpolowane liniowo między
+        sąsiednimi klatkami okresu. Punkty spoza siatki cache’u (np. pierścienie LOD)
+        liczymy wprost.
+        """
+        block = self._block(X, Z)
+        if block is None:
+            return base_wave_with_gradient(X, Z, t)
+        phase = (t % BASE_WAVE_PERIOD) / BASE_WAVE_PERIOD * self.frames
+        k0 = int(phase) % self.frames
+        k1 = (k0 + 1) % self.frames
+        a = np.float32(phase - int(phase))
+        self._fill(k0)
+        self._fill(k1)
+        sx, sz = block
+        return tuple(values[k0, sx, sz] * (1 - a) + values[k1, sx, sz] * a
+                     for values in (self.heights, self.grad_x, self.grad_z))
+
+
+class BaseWaveCache:
+    """
+    Okresy fali podstawowej po (grid_range, spacing) w kolejności LRU. Nowy zestaw
+    wyrzuca najdawniej używane, aż zmieści się w budżecie; zestaw większy niż cały
+    budżet nie jest cache’owany (for_grid zwraca wtedy zwykłe base_wave_with_gradient).
+    """
+
+    def __init__(self, frames=WAVE_CACHE_FRAMES, budget=WAVE_CACHE_BUDGET):
+        self.frames = frames
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self.entries.values())
+
+    def entry(self, grid_range, spacing):
+        """CachedPeriod dla siatki albo None, jeśli nie mieści się w budżecie."""
+        key = (grid_range, spacing)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        size = CachedPeriod.nbytes_for(grid_range, spacing, self.frames)
+        if size > self.budget:
+            return None
+        while self.entries and self.nbytes + size > self.budget:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        entry = CachedPeriod(grid_range, spacing, self.frames)
+        self.entries[key] = entry
+        return entry
+
+    def for_grid(self, grid_range, spacing):
+        """Funkcja fali podstawowej (X, Z, t) -> (h, dh/dx, dh/dz) dla tej siatki."""
+        entry = self.entry(grid_range, spacing)
+        return base_wave_with_gradient if entry is None else entry.wave_with_gradient
+
+    def clear(self):
+        self.entries.clear()
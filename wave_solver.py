@@ -0,0 +1,171 @@
+import math
+
+import numpy as np
+
+from heightfield import WAVELENGTH, SPEED, base_wave_with_gradient, grid_axis
+
+# --------------------------------------------------------------------------------
+#   Ripple z równania falowego: tłumione równanie falowe 2D na siatce wody,
+#   koszt klatki stały niezależnie od liczby kliknięć
+# --------------------------------------------------------------------------------
+
+# Tłumienie γ w u_tt = c² ∇²u − γ u_t: amplituda maleje jak exp(−γ t / 2),
+# po ~3 jednostkach czasu (MAX_LIFETIME klatek) zostaje ok. 10 %
+SOLVER_DAMPING = 1.5
+
+# Liczba Couranta c·dt / h na podkrok (stabilność w 2D wymaga <= 1/√2)
+SOLVER_CFL = 0.5
+
+# Limit kroków na jedno advance(): po dłuższej przerwie nadmiar czasu jest
+# pomijany – pole stoi przez ten odcinek (patrz WaveSolver.advance)
+SOLVER_MAX_SUBSTEPS = 16
+
+# Pas przy brzegu (w punktach siatki) z rosnącym tłumieniem, żeby fale nie odbijały się
+# od krawędzi siatki jak od ściany
+SOLVER_BORDER_POINTS = 4
+SOLVER_BORDER_DAMPING = 20.0
+
+# Kliknięcie: gaussowskie wybrzuszenie o tej wysokości i promieniu (jednostki siatki)
+SOLVER_IMPULSE = 2.0
+SOLVER_IMPULSE_RADIUS = WAVELENGTH / 4
+
+
+def border_damping(n, border=SOLVER_BORDER_POINTS, strength=SOLVER_BORDER_DAMPING):
+    """Dodatkowe tłumienie (n, n): 0 we wnętrzu, rośnie kwadratowo do strength na brzegu."""
+    if border <= 0:
+        return np.zeros((n, n))
+    index = np.arange(n)
+    d = np.minimum(index, n - 1 - index)
+    ramp = np.clip((border - d) / border, 0.0, 1.0) ** 2
+    return strength * np.maximum(ramp[:, None], ramp[None, :])
+
+
+class WaveSolver:
+    """
+    Wychylenie u na siatce (grid_range, spacing) – tej samej co siatka wody.
+
+        u_tt = c² ∇²u − γ u_t,   c = WAVELENGTH · SPEED (prędkość fazowa rippli)
+
+    Schemat leapfrog z 5-punktowym laplasjanem i stałym krokiem dt (c·dt / h = cfl):
+        u⁺ = (2u − (1 − γdt/2) u⁻ + (c dt)² ∇²u) / (1 + γdt/2)
+    Brzeg siatki trzymamy na zerze, a pas przy brzegu jest mocniej tłumiony.
+    Interferencja i wygaszanie wynikają z równania, więc kliknięcia to tylko
+    impulsy w polu u – nie ma listy rippli sumowanej w każdym punkcie.
+
+    Jak SimClock: u jest zawsze w chwili time (wielokrotność dt od startu), u⁻
+    w time − dt, a pole w żądanej chwili t z advance(t) to mieszanka liniowa obu
+    poziomów. Dzięki temu sample() zwraca stan dokładnie z chwili t.
+    """
+
+    def __init__(self, grid_range, spacing, speed=WAVELENGTH * SPEED, damping=SOLVER_DAMPING,
+                 cfl=SOLVER_CFL, border=SOLVER_BORDER_POINTS):
+        self.axis = grid_axis(grid_range, spacing)
+        self.spacing = spacing
+        self.speed = speed
+        self.dt = cfl * spacing / speed
+        n = len(self.axis)
+        self.u = np.zeros((n, n))
+        self.u_prev = np.zeros((n, n))
+        self._u_next = np.zeros((n, n))
+        self._lap = np.zeros((n - 2, n - 2))
+        self.gamma = damping + border_damping(n, border)
+        self.time = None     # chwila poziomu u
+        self.target = None   # chwila t z ostatniego advance()
+        self._field = None
+        self._gradient = None
+
+    def impulse(self, x, z, strength=SOLVER_IMPULSE, radius=SOLVER_IMPULSE_RADIUS):
+        """Kliknięcie w (x, z): wybrzuszenie dodane do u i u⁻ (zerowa prędkość początkowa)."""
+        gx = np.exp(-0.5 * ((self.axis - x) / radius) ** 2)
+        gz = np.exp(-0.5 * ((self.axis - z) / radius) ** 2)
+        bump = strength * np.outer(gx, gz)
+        # Brzeg zostaje na zerze – step() liczy tylko wnętrze, więc wartość wpisana
+        # na brzeg zostałaby tam na zawsze jako stałe źródło
+        bump[0, :] = bump[-1, :] = bump[:, 0] = bump[:, -1] = 0.0
+        self.u += bump
+        self.u_prev += bump
+        self._field = self._gradient = None
+
+    def step(self):
+        """Jeden krok schematu o dt."""
+        dt = self.dt
+        u, u_prev, u_next, lap = self.u, self.u_prev, self._u_next, self._lap
+        np.add(u[2:, 1:-1], u[:-2, 1:-1], out=lap)
+        lap += u[1:-1, 2:]
+        lap += u[1:-1, :-2]
+        lap -= 4.0 * u[1:-1, 1:-1]
+        lap *= (self.speed * dt / self.spacing) ** 2
+
+        a = self.gamma[1:-1, 1:-1] * (0.5 * dt)
+        inner = u_next[1:-1, 1:-1]
+        np.multiply(u[1:-1, 1:-1], 2.0, out=inner)
+        inner -= (1.0 - a) * u_prev[1:-1, 1:-1]
+        inner += lap
+        inner /= 1.0 + a
+
+        # Rotacja buforów: u⁻ ← u, u ← u⁺ (brzeg u_next zostaje zerowy)
+        self.u_prev, self.u, self._u_next = u, u_next, u_prev
+
+    @property
+    def earliest(self):
+        """Najwcześniejsza chwila, którą advance() jeszcze obsłuży (−inf przed pierwszym)."""
+        return -math.inf if self.time is None else self.time - self.dt
+
+    def advance(self, t):
+        """
+        Ustawia pole na chwilę t: kroki o dt, aż time >= t, potem mieszanie u⁻ i u.
+        Wstecz da się cofnąć najwyżej o jeden krok (do earliest) – wcześniejsze t
+        to ValueError, a nie po cichu stan z innej chwili.
+        Gdy do t brakuje więcej niż SOLVER_MAX_SUBSTEPS kroków (np. po przerwie),
+        nadmiar jest pomijany: pole stoi, a time przeskakuje do t − SOLVER_MAX_SUBSTEPS · dt.
+        """
+        if self.time is None:
+            self.time = t
+        if t < self.earliest:
+            raise ValueError("WaveSolver cannot go back to t=%g, its state is at t=%g" % (t, self.time))
+        steps = max(0, math.ceil((t - self.time) / self.dt - 1e-9))
+        if steps > SOLVER_MAX_SUBSTEPS:
+            self.time = t - SOLVER_MAX_SUBSTEPS * self.dt
+            steps = SOLVER_MAX_SUBSTEPS
+        for _ in range(steps):
+            self.step()
+            self.time += self.dt
+        self.target = t
+        self._field = self._gradient = None
+
+    def field(self):
+        """Pole u w chwili target (mieszanka u⁻ i u), liczone raz po każdym advance()."""
+        if self._field is None:
+            weight = 1.0 if self.target is None else 1.0 - (self.time - self.target) / self.dt
+            self._field = self.u_prev + (self.u - self.u_prev) * weight
+        return self._field
+
+    @property
+    def amplitude(self):
+        """Największe |u| – do AABB kafli wody."""
+        return float(np.abs(self.field()).max())
+
+    def gradient(self):
+        """(du/dx, du/dz) różnicami centralnymi, liczone raz po każdym advance()."""
+        if self._gradient is None:
+            self._gradient = np.gradient(self.field(), self.spacing)
+        return self._gradient
+
+    def sample(self, X, Z):
+        """(u, du/dx, du/dz) w punktach siatki (X, Z); poza obszarem solvera zero."""
+        n = len(self.axis)
+        i = np.rint((np.asarray(X) - self.axis[0]) / self.spacing).astype(np.int64)
+        j = np.rint((np.asarray(Z) - self.axis[0]) / self.spacing).astype(np.int64)
+        inside = (i >= 0) & (i < n) & (j >= 0) & (j < n)
+        i, j = np.where(inside, i, 0), np.where(inside, j, 0)
+        u = self.field()
+        ux, uz = self.gradient()
+        return (np.where(inside, u[i, j], 0.0),
+                np.where(inside, ux[i, j], 0.0),
+                np.where(inside, uz[i, j], 0.0))
+
+    def combined_with_gradient(self, X, Z, t, base=base_wave_with_gradient):
+        """Fala podstawowa + pole solvera: (h, dh/dx, dh/dz), jak base_wave_with_gradient."""
+        h, gx, gz = base(X, Z, t)
+        u, ux, uz = self.sample(X, Z)
+        return h + u, gx + ux, gz + uz